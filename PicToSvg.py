@@ -2,57 +2,25 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
 import json
-import subprocess
+import base64
+import queue
 import threading
-import sys
-from pathlib import Path
+import multiprocessing
+from pictosvg_core import (PRESETS, AUTO_PRESET, PARAM_KEYS, ENGINES, EXECUTABLE_NAME, CPU_COUNT, DEFAULT_OPTIONS, IMAGE_EXTS, Image,
+                           resource_path, resolve_engine, run_batch, iter_images, auto_params, format_bytes)
+from pictosvg_watch import watch
+from pictosvg_preview import Previewer
 
 # === 全局配置 ===
 CONFIG_FILE = "config.json"
 APP_TITLE = "PicToSvg图片批量转矢量工具v1.6 final"
 APP_VERSION = "v1.6 final | by Carry Cai | 微信:imcc1688 | 公众号:无趣研习社"
-EXECUTABLE_NAME = "vtracer.exe" if os.name == 'nt' else "vtracer"
 ICON_NAME = "icon.ico" # 定义图标文件名
-
-# === 核心：资源路径获取 (关键修改：支持打包后的资源读取) ===
-def resource_path(relative_path):
-    """ 获取资源绝对路径，兼容开发环境和打包后的环境 """
-    if getattr(sys, 'frozen', False):
-        # PyInstaller 打包后的临时目录
-        base_path = sys._MEIPASS
-    else:
-        # 开发环境
-        base_path = os.getcwd()
-    return os.path.join(base_path, relative_path)
-
-# === 预设参数 ===
-PRESETS = {
-    "默认 (Default)": {
-        "colormode": "color", "hierarchical": "stacked", "mode": "spline",
-        "filter_speckle": 4, "color_precision": 6, "gradient_step": 16,
-        "corner_threshold": 60, "segment_length": 5.0, "splice_threshold": 45, "path_precision": 8
-    },
-    "毛笔字 (Calligraphy)": {
-        "colormode": "bw", "hierarchical": "stacked", "mode": "spline",
-        "filter_speckle": 2, "color_precision": 8, "gradient_step": 16,
-        "corner_threshold": 45, "segment_length": 3.5, "splice_threshold": 30, "path_precision": 6
-    },
-    "黑白 (BW)": {
-        "colormode": "bw", "hierarchical": "stacked", "mode": "spline",
-        "filter_speckle": 4, "color_precision": 6, "gradient_step": 16,
-        "corner_threshold": 60, "segment_length": 5.0, "splice_threshold": 45, "path_precision": 8
-    },
-    "海报 (Poster)": {
-        "colormode": "color", "hierarchical": "stacked", "mode": "spline",
-        "filter_speckle": 8, "color_precision": 8, "gradient_step": 64,
-        "corner_threshold": 60, "segment_length": 5.0, "splice_threshold": 45, "path_precision": 8
-    },
-    "照片 (Photo)": {
-        "colormode": "color", "hierarchical": "stacked", "mode": "spline",
-        "filter_speckle": 2, "color_precision": 8, "gradient_step": 16,
-        "corner_threshold": 180, "segment_length": 3.5, "splice_threshold": 180, "path_precision": 10
-    }
-}
+LOG_TICK_MS = 100        # 日志与进度的界面刷新间隔
+LOG_MAX_LINES = 1000     # 界面日志最多保留的行数，完整日志写入输出目录的日志文件
+LOG_FILE_NAME = "pictosvg_log.txt"
+PREVIEW_DEBOUNCE_MS = 300 # 参数停止变化多久后刷新预览
+PREVIEW_SIZE = (320, 240) # 预览区大小 (样张缩小到此范围内再转换)
 
 # === 图形绘制辅助函数 ===
 def create_rounded_rect(canvas, x1, y1, x2, y2, radius=25, **kwargs):
@@ -217,7 +185,31 @@ class PicToSvgApp:
         self.output_dir = tk.StringVar()
         self.process_subdirs = tk.BooleanVar(value=False)
         self.delete_original = tk.BooleanVar(value=False)
+        self.workers = tk.IntVar(value=CPU_COUNT)
+        self.engine = tk.StringVar(value="cli")
+        self.force_rebuild = tk.BooleanVar(value=False)
+        self.record_metrics = tk.BooleanVar(value=False)
+        self.optimize_svg = tk.BooleanVar(value=False)
+        self.svgz = tk.BooleanVar(value=False)
+        self.dedupe = tk.BooleanVar(value=False)
+        self.watch_mode = tk.BooleanVar(value=False) # 持续监视输入文件夹
+        self.auto_preset = tk.BooleanVar(value=False) # 自动预设：逐个文件分析后选择，参数滑块停用
+        self.timeout = tk.IntVar(value=0)
+        self.mem_limit_gb = tk.IntVar(value=0)
+        self.max_edge = tk.IntVar(value=0)
+        self.denoise = tk.IntVar(value=0)
+        self.pre_colors = tk.IntVar(value=0)
+        self.tile_mp = tk.IntVar(value=DEFAULT_OPTIONS["tile_pixels"] // 1_000_000)
         self.is_processing = False
+        # 工作线程只向队列写入，由主线程定时批量刷新界面
+        self.events = queue.Queue()
+        self.progress_value = None
+        self.run_done = threading.Event()
+        self.watch_stop = None # 监视模式运行中时为停止事件
+        # 预览：工作线程写入 preview_result，由 drain_events 在主线程显示
+        self.previewer, self.preview_sample, self.preview_sizes, self.preview_visible = None, None, None, False
+        self.preview_job, self.preview_result, self.preview_photo, self.preview_note = None, None, None, ""
+        self.log_file, self.log_lock = None, threading.Lock()
         self.log_visible = False
         
         # 参数初始化
@@ -239,6 +231,8 @@ class PicToSvgApp:
         self.check_param_states()
         self.root.update_idletasks()
         self.root.geometry("") 
+        self.root.after(LOG_TICK_MS, self.drain_events)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def setup_styles(self):
         style = ttk.Style()
@@ -280,7 +274,15 @@ class PicToSvgApp:
         opt_frame = ttk.Frame(main_pad)
         opt_frame.pack(fill="x", pady=(0, 10))
         BigCheck(opt_frame, "处理子文件夹文件", self.process_subdirs).pack(side="left", padx=(0, 40))
-        BigCheck(opt_frame, "处理成功后删除原文件", self.delete_original).pack(side="left")
+        BigCheck(opt_frame, "处理成功后删除原文件", self.delete_original).pack(side="left", padx=(0, 40))
+        BigCheck(opt_frame, "强制全部重新转换", self.force_rebuild).pack(side="left", padx=(0, 40))
+        BigCheck(opt_frame, "监视文件夹(自动转换新图片)", self.watch_mode).pack(side="left")
+        opt_frame2 = ttk.Frame(main_pad)
+        opt_frame2.pack(fill="x", pady=(0, 10))
+        BigCheck(opt_frame2, "记录性能数据", self.record_metrics).pack(side="left", padx=(0, 40))
+        BigCheck(opt_frame2, "优化SVG体积", self.optimize_svg).pack(side="left", padx=(0, 40))
+        BigCheck(opt_frame2, "输出.svgz压缩文件", self.svgz).pack(side="left", padx=(0, 40))
+        BigCheck(opt_frame2, "相同文件只转换一次", self.dedupe).pack(side="left")
 
         # 3. 参数
         param_area = ttk.Frame(main_pad)
@@ -288,7 +290,7 @@ class PicToSvgApp:
         preset_frame = ttk.Frame(param_area)
         preset_frame.pack(fill="x", pady=(0, 10))
         ttk.Label(preset_frame, text="快速预设:", style="Title.TLabel").pack(side="left", padx=(0, 10))
-        for name in PRESETS.keys():
+        for name in list(PRESETS.keys()) + [AUTO_PRESET]:
             ttk.Button(preset_frame, text=name, style="Preset.TButton", command=lambda n=name: self.apply_preset(n)).pack(side="left", padx=4)
 
         grid_frame = ttk.Frame(param_area)
@@ -333,11 +335,31 @@ class PicToSvgApp:
         add_slider(3, 3, "拼接阈值", self.p_splice_threshold, 0, 180, "越低曲线拟合越精准", "splice_threshold")
         add_slider(4, 0, "路径精度", self.p_path_precision, 0, 16, "越高路径坐标越精确", "path_precision")
         add_radio(5, 0, "堆叠方式", self.p_hierarchical, [("Stacked", "stacked"), ("Cutout", "cutout")], "Stacked(推荐) 或 Cutout(形状互不重叠)", "hierarchical")
+        add_slider(5, 3, "并发数", self.workers, 1, max(2, CPU_COUNT * 2), f"同时转换的文件数(默认CPU核数{CPU_COUNT})", "workers")
+        add_radio(6, 0, "转换引擎", self.engine, [("CLI", "cli"), ("Python", "python")], "Python 引擎免去进程启动开销(需安装 vtracer 模块)", "engine")
+        add_slider(6, 3, "超时(秒)", self.timeout, 0, 600, "单张图超时后自动降级参数重试(0为不限)", "timeout")
+        add_slider(7, 0, "内存上限(GB)", self.mem_limit_gb, 0, 32, "单张图超出后自动降级参数重试(0为不限)", "mem_limit")
+        add_slider(7, 3, "最大边长", self.max_edge, 0, 8000, "转换前缩小大图，输出仍为原尺寸(0为不缩小，需Pillow)", "max_edge")
+        add_slider(8, 0, "预去噪", self.denoise, 0, 9, "转换前中值滤波窗口(0为关闭)", "denoise")
+        add_slider(8, 3, "预量化颜色", self.pre_colors, 0, 256, "转换前减少到N种颜色(0为关闭)", "pre_colors")
+        add_slider(9, 0, "分块阈值(MP)", self.tile_mp, 0, 400, "超过N百万像素的图片分块并行转换后拼接(0为关闭)", "tile_mp")
 
         # 4. 日志 & 按钮
-        log_ctrl = ttk.Frame(main_pad); log_ctrl.pack(fill="x", pady=(15, 5))
+        log_ctrl = ttk.Frame(main_pad); log_ctrl.pack(fill="x", pady=(15, 5)); self.log_ctrl = log_ctrl
         self.btn_log = ttk.Button(log_ctrl, text="▼ 显示日志", command=self.toggle_log); self.btn_log.pack(side="left")
+        self.btn_preview = ttk.Button(log_ctrl, text="▼ 显示预览", command=self.toggle_preview); self.btn_preview.pack(side="left", padx=(10, 0))
+        ttk.Button(log_ctrl, text="继续上次中断的转换", command=lambda: self.start_processing_thread(resume=True)).pack(side="right")
         
+        self.preview_container = ttk.Frame(main_pad)
+        self.preview_canvas = tk.Canvas(self.preview_container, width=PREVIEW_SIZE[0], height=PREVIEW_SIZE[1], bg="#f8f9fa", highlightthickness=0)
+        self.preview_canvas.pack(side="left")
+        side = ttk.Frame(self.preview_container); side.pack(side="left", fill="both", expand=True, padx=15)
+        ttk.Button(side, text="选择样张", command=self.select_sample).pack(anchor="w")
+        self.preview_info = ttk.Label(side, text="", style="Desc.TLabel", justify="left")
+        self.preview_info.pack(anchor="w", pady=(8, 0))
+        for k in PARAM_KEYS: getattr(self, f"p_{k}").trace_add("write", lambda *a: self.schedule_preview())
+        self.auto_preset.trace_add("write", lambda *a: self.schedule_preview())
+
         self.log_container = ttk.Frame(main_pad)
         self.log_text = tk.Text(self.log_container, height=5, state="disabled", font=("Consolas", 12), relief="flat", bg="#f8f9fa", fg="#555", padx=10, pady=5)
         self.scrollbar = MinimalScrollbar(self.log_container, command=self.log_text.yview, width=8)
@@ -354,8 +376,12 @@ class PicToSvgApp:
         ttk.Label(main_pad, text=APP_VERSION, style="Desc.TLabel").pack(side="right")
 
     def apply_preset(self, name):
+        if name == AUTO_PRESET:
+            self.auto_preset.set(True); self.check_param_states()
+            return self.log(f"已应用预设: {name} (逐个文件分析后选择)")
         p = PRESETS.get(name)
         if not p: return
+        self.auto_preset.set(False)
         for k, v in p.items(): getattr(self, f"p_{k}").set(v)
         self.check_param_states()
         self.log(f"已应用预设: {name}")
@@ -363,9 +389,11 @@ class PicToSvgApp:
     def check_param_states(self):
         is_bw = (self.p_colormode.get() == 'bw')
         mode = self.p_mode.get()
-        rules = [("color_precision", not is_bw), ("gradient_step", not is_bw), ("hierarchical", not is_bw),
-                 ("corner_threshold", mode != "pixel"), ("segment_length", mode != "pixel"), ("splice_threshold", mode == "spline")]
-        for key, active in rules:
+        rules = {"color_precision": not is_bw, "gradient_step": not is_bw, "hierarchical": not is_bw,
+                 "corner_threshold": mode != "pixel", "segment_length": mode != "pixel", "splice_threshold": mode == "spline"}
+        auto = self.auto_preset.get() # 自动预设时全部参数由分析结果决定
+        for key in PARAM_KEYS:
+            active = rules.get(key, True) and not auto
             for w in self.widget_refs.get(key, []):
                 state = "normal" if active else "disabled"
                 if hasattr(w, 'set_state'): w.set_state(state)
@@ -383,17 +411,113 @@ class PicToSvgApp:
         self.log_visible = not self.log_visible
         self.root.geometry("")
 
+    # === 预览 ===
+    def toggle_preview(self):
+        if self.preview_visible:
+            self.preview_container.pack_forget()
+            self.btn_preview.config(text="▼ 显示预览")
+            if self.previewer: self.previewer.cancel()
+        else:
+            self.preview_container.pack(fill="x", pady=(0, 10), before=self.log_ctrl)
+            self.btn_preview.config(text="▲ 隐藏预览")
+        self.preview_visible = not self.preview_visible
+        self.root.geometry("")
+        if self.preview_visible and self.ensure_sample(): self.schedule_preview(0)
+
+    def ensure_previewer(self):
+        if Image is None: self.preview_info.config(text="预览需要安装 Pillow (pip install pillow)"); return False
+        if not self.previewer: self.previewer = Previewer(self.engine.get(), resource_path(EXECUTABLE_NAME))
+        return True
+
+    def ensure_sample(self):
+        """ 未选择样张时取输入文件夹中的第一张图片 """
+        if not self.ensure_previewer(): return False
+        if self.preview_sample: return True
+        in_d = self.input_dir.get()
+        first = next(iter_images(in_d, self.process_subdirs.get()), None) if in_d and os.path.isdir(in_d) else None
+        if not first: self.preview_info.config(text="请选择样张"); return False
+        return self.set_sample(first[0])
+
+    def select_sample(self):
+        p = filedialog.askopenfilename(filetypes=[("图片", " ".join("*" + e for e in sorted(IMAGE_EXTS)))])
+        if p and self.ensure_previewer() and self.set_sample(p): self.schedule_preview(0)
+
+    def set_sample(self, fp):
+        try: full, size = self.previewer.set_sample(fp, PREVIEW_SIZE)
+        except Exception as e: self.preview_info.config(text=f"无法读取样张: {e}"); return False
+        self.preview_sample, self.preview_sizes = fp, (full, size)
+        return True
+
+    def schedule_preview(self, delay=PREVIEW_DEBOUNCE_MS):
+        """ 防抖：参数停止变化 delay 毫秒后才重新转换 """
+        if not self.preview_visible or not self.preview_sample: return
+        if self.preview_job: self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(delay, self.update_preview)
+
+    def update_preview(self):
+        self.preview_job = None
+        params, self.preview_note = self.get_params(), ""
+        if self.auto_preset.get():
+            try: self.preview_note, params = auto_params(self.preview_sample)
+            except Exception: pass # 缺少 NumPy 等情况下按当前参数预览
+        self.preview_info.config(text="预览中...")
+        self.previewer.request(params, lambda r: setattr(self, "preview_result", r))
+
+    def show_preview(self, r):
+        if "error" in r: return self.preview_info.config(text=f"预览失败: {r['error']}")
+        self.preview_photo = tk.PhotoImage(data=base64.b64encode(r["image"]))
+        c = self.preview_canvas
+        c.delete("all"); c.create_image(PREVIEW_SIZE[0] // 2, PREVIEW_SIZE[1] // 2, image=self.preview_photo)
+        (fw, fh), (w, h) = self.preview_sizes
+        lines = [f"样张: {os.path.basename(self.preview_sample)} ({fw}x{fh}，预览 {w}x{h})",
+                 f"元素数: {r['elements']}    预览耗时: {r['time']:.2f}s",
+                 f"原尺寸预计: 约 {r['est_time']:.1f}s，约 {format_bytes(r['est_bytes'])}"]
+        if self.preview_note: lines.insert(1, f"自动预设: {self.preview_note}")
+        self.preview_info.config(text="\n".join(lines))
+
+    def on_close(self):
+        if self.previewer: self.previewer.close()
+        self.root.destroy()
+
     def log(self, msg):
-        self.log_text.config(state="normal")
-        self.log_text.insert("end", msg + "\n")
-        self.log_text.see("end")
-        self.log_text.config(state="disabled")
+        """ 线程安全：写入日志文件并入队，界面由 drain_events 统一刷新 """
+        with self.log_lock:
+            if self.log_file:
+                try: self.log_file.write(msg + "\n")
+                except: pass
+        self.events.put(msg)
+
+    def drain_events(self):
+        """ 主线程定时执行：批量写入日志 (环形保留最近 LOG_MAX_LINES 行)，进度只取最新值 """
+        lines = []
+        try:
+            while len(lines) < 10000: lines.append(self.events.get_nowait())
+        except queue.Empty: pass
+        if lines:
+            self.log_text.config(state="normal")
+            self.log_text.insert("end", "\n".join(lines[-LOG_MAX_LINES:]) + "\n")
+            excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+            if excess > 0: self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_text.see("end")
+            self.log_text.config(state="disabled")
+        v, self.progress_value = self.progress_value, None
+        if v is not None: self.progress.set_value(v)
+        r, self.preview_result = self.preview_result, None
+        if r is not None: self.show_preview(r)
+        if self.run_done.is_set() and self.events.empty():
+            self.run_done.clear()
+            with self.log_lock:
+                if self.log_file: self.log_file.close(); self.log_file = None
+            self.btn_run.set_state("normal", "开始转换"); self.is_processing = False; self.watch_stop = None
+        self.root.after(LOG_TICK_MS, self.drain_events)
 
     def select_input(self):
         p = filedialog.askdirectory()
         if p:
             self.input_dir.set(p)
             if not self.output_dir.get(): self.output_dir.set(os.path.join(p, "output"))
+            self.preview_sample = None # 换文件夹后改用新文件夹中的样张
+            if self.preview_visible and self.ensure_sample(): self.schedule_preview(0)
 
     def select_output(self):
         p = filedialog.askdirectory()
@@ -408,6 +532,21 @@ class PicToSvgApp:
                     self.output_dir.set(data.get("output", ""))
                     self.process_subdirs.set(data.get("subdirs", False))
                     self.delete_original.set(data.get("delete", False))
+                    self.workers.set(data.get("workers", CPU_COUNT))
+                    if data.get("engine") in ENGINES: self.engine.set(data["engine"])
+                    self.force_rebuild.set(data.get("force", False))
+                    self.record_metrics.set(data.get("metrics", False))
+                    self.optimize_svg.set(data.get("optimize", False))
+                    self.svgz.set(data.get("svgz", False))
+                    self.dedupe.set(data.get("dedupe", False))
+                    self.watch_mode.set(data.get("watch", False))
+                    self.auto_preset.set(data.get("auto", False))
+                    self.timeout.set(data.get("timeout", 0))
+                    self.mem_limit_gb.set(data.get("mem_limit_gb", 0))
+                    self.max_edge.set(data.get("max_edge", 0))
+                    self.denoise.set(data.get("denoise", 0))
+                    self.pre_colors.set(data.get("colors", 0))
+                    self.tile_mp.set(data.get("tile_mp", DEFAULT_OPTIONS["tile_pixels"] // 1_000_000))
                     if "colormode" in data: self.p_colormode.set(data["colormode"])
                     if "hierarchical" in data: self.p_hierarchical.set(data["hierarchical"])
                     if "mode" in data: self.p_mode.set(data["mode"])
@@ -424,7 +563,10 @@ class PicToSvgApp:
         try:
             data = {
                 "input": self.input_dir.get(), "output": self.output_dir.get(),
-                "subdirs": self.process_subdirs.get(), "delete": self.delete_original.get(),
+                "subdirs": self.process_subdirs.get(), "delete": self.delete_original.get(), "workers": self.workers.get(), "engine": self.engine.get(), "force": self.force_rebuild.get(), "metrics": self.record_metrics.get(),
+                "optimize": self.optimize_svg.get(), "svgz": self.svgz.get(), "dedupe": self.dedupe.get(), "auto": self.auto_preset.get(), "watch": self.watch_mode.get(),
+                "timeout": self.timeout.get(), "mem_limit_gb": self.mem_limit_gb.get(),
+                "max_edge": self.max_edge.get(), "denoise": self.denoise.get(), "colors": self.pre_colors.get(), "tile_mp": self.tile_mp.get(),
                 "colormode": self.p_colormode.get(), "hierarchical": self.p_hierarchical.get(),
                 "mode": self.p_mode.get(), "filter_speckle": self.p_filter_speckle.get(),
                 "color_precision": self.p_color_precision.get(), "gradient_step": self.p_gradient_step.get(),
@@ -435,76 +577,58 @@ class PicToSvgApp:
                 json.dump(data, f, ensure_ascii=False, indent=2)
         except: pass
 
-    def start_processing_thread(self):
-        if self.is_processing: return
+    def start_processing_thread(self, resume=False):
+        if self.is_processing:
+            # 监视模式下按钮用于停止：已提交的任务完成后结束
+            if self.watch_stop and not self.watch_stop.is_set():
+                self.watch_stop.set(); self.btn_run.set_state("disabled", "正在停止...")
+            return
         in_d = self.input_dir.get()
         if not in_d or not os.path.exists(in_d): return messagebox.showerror("提示", "请选择输入文件夹")
         exe_path = resource_path(EXECUTABLE_NAME)
-        if not os.path.exists(exe_path): return messagebox.showerror("错误", f"找不到 {EXECUTABLE_NAME}")
+        if resolve_engine(self.engine.get()) == "cli" and not os.path.exists(exe_path): return messagebox.showerror("错误", f"找不到 {EXECUTABLE_NAME}")
         
         if self.p_colormode.get() == "color":
             if self.p_color_precision.get() >= 8 and self.p_gradient_step.get() == 0:
                 self.p_gradient_step.set(1)
         
+        if not self.output_dir.get(): self.output_dir.set(os.path.join(in_d, "output"))
+        out_d = self.output_dir.get()
         self.save_config()
         if not self.log_visible: self.toggle_log()
         self.is_processing = True
-        self.btn_run.set_state("disabled", "处理中...")
+        self.watch_stop = threading.Event() if self.watch_mode.get() else None
+        if self.watch_stop: self.btn_run.set_state("normal", "停止监视")
+        else: self.btn_run.set_state("disabled", "处理中...")
         self.log_text.config(state="normal"); self.log_text.delete(1.0, "end"); self.log_text.config(state="disabled")
-        threading.Thread(target=self.process, args=(exe_path, in_d, self.output_dir.get()), daemon=True).start()
-
-    def process(self, exe, in_dir, out_dir):
-        files = []
-        exts = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
-        if self.process_subdirs.get():
-            for r, _, fs in os.walk(in_dir):
-                for f in fs:
-                    if Path(f).suffix.lower() in exts: files.append(os.path.join(r, f))
-        else:
-            if os.path.exists(in_dir):
-                for f in os.listdir(in_dir):
-                    fp = os.path.join(in_dir, f)
-                    if os.path.isfile(fp) and Path(f).suffix.lower() in exts: files.append(fp)
-        
-        total = len(files)
-        if total == 0: self.log("未找到图片"); self.reset_ui(); return
-        self.log(f"开始处理 {total} 个文件...")
-        if not os.path.exists(out_dir): 
-            try: os.makedirs(out_dir) 
-            except: pass
-            
-        success = 0
-        for i, fp in enumerate(files):
-            rel = os.path.relpath(fp, in_dir)
-            out = os.path.join(out_dir, os.path.dirname(rel)) if self.process_subdirs.get() else out_dir
-            if not os.path.exists(out): os.makedirs(out)
-            out_p = os.path.join(out, Path(fp).stem + ".svg")
-            
-            cmd = [exe, "--input", fp, "--output", out_p, "--colormode", self.p_colormode.get(), "--mode", self.p_mode.get(), "--filter_speckle", str(self.p_filter_speckle.get()), "--path_precision", str(self.p_path_precision.get())]
-            if self.p_colormode.get() == 'color': cmd.extend(["--color_precision", str(self.p_color_precision.get()), "--gradient_step", str(self.p_gradient_step.get()), "--hierarchical", self.p_hierarchical.get()])
-            if self.p_mode.get() != 'pixel': cmd.extend(["--corner_threshold", str(self.p_corner_threshold.get()), "--segment_length", str(self.p_segment_length.get())])
-            if self.p_mode.get() == 'spline': cmd.extend(["--splice_threshold", str(self.p_splice_threshold.get())])
-            
-            try:
-                startup = None
-                if os.name == 'nt': startup = subprocess.STARTUPINFO(); startup.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                res = subprocess.run(cmd, capture_output=True, text=True, startupinfo=startup)
-                if res.returncode == 0:
-                    self.log(f"[{i+1}/{total}] ✅ {rel}")
-                    success += 1
-                    if self.delete_original.get(): 
-                        try: os.remove(fp)
-                        except: pass
-                else: self.log(f"[{i+1}/{total}] ❌ {rel}")
-            except Exception as e: self.log(f"错误: {e}")
-            self.root.after(10, lambda v=(i+1)/total*100: self.progress.set_value(v))
-            
-        self.log(f"完成! 成功: {success}/{total}")
+        try:
+            os.makedirs(out_d, exist_ok=True)
+            self.log_file = open(os.path.join(out_d, LOG_FILE_NAME), 'w', encoding='utf-8')
+        except OSError: self.log_file = None
+        # Tk 变量只在主线程读取，工作线程拿到的是普通字典
+        options = {"recursive": self.process_subdirs.get(), "delete": self.delete_original.get(), "workers": self.workers.get(),
+                   "engine": self.engine.get(), "force": self.force_rebuild.get(), "exe": exe_path,
+                   "metrics": self.record_metrics.get(), "timeout": self.timeout.get(), "mem_limit": self.mem_limit_gb.get() * 1024,
+                   "max_edge": self.max_edge.get(), "denoise": self.denoise.get(), "colors": self.pre_colors.get(),
+                   "tile_pixels": self.tile_mp.get() * 1_000_000, "optimize": self.optimize_svg.get(), "svgz": self.svgz.get(),
+                   "dedupe": "content" if self.dedupe.get() else "", "auto": self.auto_preset.get(), "resume": resume}
+        threading.Thread(target=self.process, args=(in_d, out_d, self.get_params(), options), daemon=True).start()
+
+    def get_params(self):
+        return {k: getattr(self, f"p_{k}").get() for k in PARAM_KEYS}
+
+    def process(self, in_dir, out_dir, params, options):
+        def progress(done, total): self.progress_value = done / total * 100
+        try:
+            if self.watch_stop: watch(in_dir, out_dir, params, options, log=self.log, progress=progress, stop=self.watch_stop)
+            else: run_batch(in_dir, out_dir, params, options, log=self.log, progress=progress)
+        except Exception as e: self.log(f"错误: {e}")
         self.reset_ui()
 
-    def reset_ui(self): self.root.after(0, lambda: [self.btn_run.set_state("normal", "开始转换"), setattr(self, 'is_processing', False)])
+    def reset_ui(self): self.run_done.set()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # 打包后 Python 引擎的工作进程需要
     root = tk.Tk()
     app = PicToSvgApp(root)
     root.mainloop()
\ No newline at end of file
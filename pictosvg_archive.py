@@ -0,0 +1,145 @@
+""" PicToSvg 归档输入/输出：直接读取 ZIP/TAR 中的图片、把 SVG 写入输出归档，不解压整个归档，复用 run_batch 流水线
+
+输入归档的成员逐个读出到临时文件 (同时最多 ARCHIVE_SPOOL 个) 交给转换，输出写入归档后立即删除，
+磁盘与内存占用不随归档中的文件数增长 (ZIP 的目录索引除外)
+"""
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import queue
+import zipfile
+from pictosvg_core import DEFAULT_OPTIONS, METRICS_NAME, SUMMARY_NAME, match_image, in_shard, shard_file, discard, commit_file, run_batch
+
+# === 归档配置 ===
+ARCHIVE_EXTS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+ARCHIVE_SPOOL = 256 # 同时读出到临时目录、等待或正在转换的成员数上限
+TAR_WRITE_MODES = {".tar": "w", ".tar.gz": "w:gz", ".tgz": "w:gz", ".tar.bz2": "w:bz2", ".tbz2": "w:bz2", ".tar.xz": "w:xz", ".txz": "w:xz"}
+
+def archive_ext(path):
+    """ 归档扩展名 (小写)，不是归档时返回 None """
+    low = path.lower()
+    return next((e for e in sorted(ARCHIVE_EXTS, key=len, reverse=True) if low.endswith(e)), None)
+
+def is_archive(path):
+    return archive_ext(path) is not None and not os.path.isdir(path)
+
+def member_path(name):
+    """ 归档成员名转为本地相对路径；含 .. 或盘符的成员返回 None，防止写出临时目录 """
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts or ".." in parts or ":" in parts[0]: return None
+    return os.path.join(*parts)
+
+def iter_members(path):
+    """ 逐个产出 (成员名, 大小, 可读文件对象)。TAR 以流式读取，不需要随机访问 """
+    if archive_ext(path) == ".zip":
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if info.is_dir(): continue
+                with zf.open(info) as f: yield info.filename, info.file_size, f
+    else:
+        with tarfile.open(path, "r|*") as tf:
+            for m in tf:
+                if not m.isfile(): continue
+                f = tf.extractfile(m)
+                if f: yield m.name, m.size, f
+
+class ArchiveWriter:
+    """ 逐个文件写入 ZIP/TAR (按扩展名选择格式与压缩)。先写入同目录临时文件，close 时原子替换 """
+    def __init__(self, path):
+        self.path, self.tmp, self.names = path, path + ".part", set()
+        ext = archive_ext(path)
+        if ext == ".zip": self.zf, self.tf = zipfile.ZipFile(self.tmp, "w", zipfile.ZIP_DEFLATED), None
+        else: self.zf, self.tf = None, tarfile.open(self.tmp, TAR_WRITE_MODES[ext])
+
+    def add(self, fp, arcname):
+        """ 同名成员会在解压时互相覆盖，拒绝写入 """
+        if arcname in self.names: raise FileExistsError(f"归档中已有同名文件: {arcname}")
+        self.names.add(arcname)
+        if self.zf: self.zf.write(fp, arcname)
+        else: self.tf.add(fp, arcname)
+
+    def close(self):
+        (self.zf or self.tf).close()
+        commit_file(self.tmp, self.path)
+
+    def abort(self):
+        try: (self.zf or self.tf).close()
+        except Exception: pass
+        discard(self.tmp)
+
+def archive_source(path, slots, log=print):
+    """ 返回供 run_batch 使用的文件来源：把匹配的成员依次读出到 in_dir 下对应的相对路径。
+    每个成员占用 slots 中的一个名额，由 sink 在该文件处理结束后归还。
+    路径相同的成员 (TAR 追加的同名成员，或 a.png 与 ./a.png) 只处理第一个，其余跳过 """
+    def source(in_dir, opts, out_dir, q, stop):
+        seen = set()
+        try:
+            for name, size, f in iter_members(path):
+                rel = member_path(name)
+                if rel is None: log(f"跳过不安全的成员路径: {name}"); continue
+                if rel in seen: log(f"跳过重复的成员: {name}"); continue
+                seen.add(rel)
+                if not match_image(rel, True, opts["include"], opts["exclude"]): continue
+                if opts["shard"] and not in_shard(rel, opts["shard"]): continue # 在读出之前过滤，其他分片的成员不占用名额
+                while not slots.acquire(timeout=0.2):
+                    if stop.is_set(): return
+                fp = os.path.join(in_dir, rel)
+                os.makedirs(os.path.dirname(fp), exist_ok=True)
+                with open(fp, 'wb') as out: shutil.copyfileobj(f, out)
+                while not stop.is_set():
+                    try: q.put((fp, size), timeout=0.2); break
+                    except queue.Full: pass
+                if stop.is_set(): return
+        except (OSError, zipfile.BadZipFile, tarfile.TarError) as e: log(f"读取归档失败: {e}")
+        finally: q.put(None)
+    return source
+
+def run_archive(src, dst, params, options=None, log=print, progress=None, stop=None):
+    """ 转换归档或文件夹 src，输出到归档或文件夹 dst (至少一方为归档)，保留相对目录结构。
+    参数与 run_batch 相同；输入为归档时始终处理所有子文件夹，不使用增量清单与去重 """
+    opts = {**DEFAULT_OPTIONS, **(options or {})}
+    in_archive, writer = is_archive(src), None
+    if in_archive: opts.update(recursive=True, delete=False)
+    if opts["dedupe"]: log("归档模式不支持去重，已关闭"); opts["dedupe"] = ""
+    opts.update(force=True, resume=False)
+    # 输出归档在 close 之前只是 .part 文件：删除原图推迟到归档落盘之后，中途失败时原图仍在
+    delete, written = opts["delete"] and is_archive(dst), []
+    if delete: opts["delete"] = False
+    work = tempfile.mkdtemp(prefix="pictosvg_archive_")
+    in_dir = os.path.join(work, "in") if in_archive else src
+    slots = threading.BoundedSemaphore(ARCHIVE_SPOOL)
+    try:
+        if is_archive(dst):
+            os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+            writer, out_dir = ArchiveWriter(dst), os.path.join(work, "out")
+        else: out_dir = dst
+
+        def sink(rel, out_p):
+            """ 单个文件处理结束：输出写入归档后删除，归还输入成员的名额 """
+            if out_p and writer:
+                writer.add(out_p, os.path.relpath(out_p, out_dir).replace(os.sep, "/"))
+                discard(out_p)
+                if delete: written.append(rel)
+            if in_archive: discard(os.path.join(in_dir, rel)); slots.release()
+
+        stats = run_batch(in_dir, out_dir, params, opts, log=log, progress=progress,
+                          source=archive_source(src, slots, log) if in_archive else None, stop=stop, sink=sink)
+        if writer:
+            shard = tuple(opts["shard"]) if opts["shard"] else None
+            for name in (shard_file(METRICS_NAME, shard) + ".jsonl", shard_file(METRICS_NAME, shard) + ".csv"):
+                if os.path.exists(os.path.join(out_dir, name)): writer.add(os.path.join(out_dir, name), name)
+            writer.close(); writer = None
+            log(f"已写入归档 {dst}")
+            for rel in written:
+                try: os.remove(os.path.join(in_dir, rel))
+                except OSError: pass
+            # 分片汇总放在归档旁边，各节点的归档在同一文件夹时可直接 --merge-shards
+            summary = shard_file(SUMMARY_NAME, shard)
+            if shard and os.path.exists(os.path.join(out_dir, summary)):
+                shutil.copyfile(os.path.join(out_dir, summary), os.path.join(os.path.dirname(os.path.abspath(dst)), summary))
+        return stats
+    finally:
+        if writer: writer.abort()
+        shutil.rmtree(work, ignore_errors=True)
@@ -0,0 +1,243 @@
+""" PicToSvg 基准测试：生成确定性的合成图片集，逐个预设走批量转换流水线，输出 JSON 结果并与基线对比
+
+用法: python -m pictosvg_bench [-o 结果.json] [--baseline 基线.json] [--save-baseline 基线.json] [--sizes 256,1024] [--repeat 3]
+
+结果包含每个预设的吞吐量、逐张耗时分位数、输出体积与峰值内存；与基线相比超出容差时列出回退项并以退出码 1 结束
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zlib
+import multiprocessing
+from pictosvg_core import PRESETS, DEFAULT_OPTIONS, ENGINES, METRICS_NAME, find_preset, make_params, percentile, format_bytes, run_batch
+
+# === 基准配置 ===
+BENCH_SEED = 20240601
+BENCH_SIZES = (256, 1024)   # 线稿、笔画、海报、照片的边长
+ICON_SIZES = (16, 32, 64)   # 小图标的边长
+BENCH_TOLERANCE = 0.10      # 相对基线的允许退化比例
+RESULT_VERSION = 1
+# 与基线对比的指标: 名称 -> 数值越大越好
+COMPARE_METRICS = {"images_per_s": True, "mpix_per_s": True, "p50": False, "p95": False, "bytes": False, "peak_rss": False}
+
+# === 合成图片 (纯 Python，不依赖 Pillow) ===
+def write_png(path, width, height, pixels):
+    """ 把 RGB bytearray 写为 PNG (每行滤波类型 0) """
+    stride = width * 3
+    raw = b"".join(b"\0" + pixels[y * stride:(y + 1) * stride] for y in range(height))
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+    with open(path, 'wb') as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(raw, 6)) + chunk(b"IEND", b""))
+
+class Canvas:
+    """ 最小的 RGB 画布：矩形、圆盘与按圆盘盖印的线条 """
+    def __init__(self, w, h, color=(255, 255, 255)):
+        self.w, self.h, self.px = w, h, bytearray(bytes(color) * (w * h))
+
+    def span(self, y, x0, x1, color):
+        x0, x1 = max(0, x0), min(self.w, x1)
+        if 0 <= y < self.h and x1 > x0: self.px[(y * self.w + x0) * 3:(y * self.w + x1) * 3] = bytes(color) * (x1 - x0)
+
+    def rect(self, x0, y0, x1, y1, color):
+        for y in range(max(0, y0), min(self.h, y1)): self.span(y, x0, x1, color)
+
+    def disc(self, cx, cy, r, color):
+        for dy in range(-int(r), int(r) + 1):
+            dx = int(math.sqrt(max(0.0, r * r - dy * dy)))
+            self.span(int(cy) + dy, int(cx) - dx, int(cx) + dx + 1, color)
+
+    def curve(self, pts, width, color, taper=False):
+        """ 二次贝塞尔曲线；taper=True 时笔画两端细中间粗 (模拟毛笔) """
+        (x0, y0), (x1, y1), (x2, y2) = pts
+        steps = max(2, int(math.hypot(x1 - x0, y1 - y0) + math.hypot(x2 - x1, y2 - y1)))
+        for i in range(steps + 1):
+            t = i / steps; u = 1 - t
+            r = width / 2 * (math.sin(math.pi * t) ** 0.7 if taper else 1)
+            self.disc(u * u * x0 + 2 * u * t * x1 + t * t * x2, u * u * y0 + 2 * u * t * y1 + t * t * y2, max(0.5, r), color)
+
+def _point(rnd, s):
+    return rnd.uniform(0, s), rnd.uniform(0, s)
+
+def draw_lineart(rnd, s):
+    c = Canvas(s, s)
+    for _ in range(12):
+        c.curve([_point(rnd, s) for _ in range(3)], max(1, s // 256), (0, 0, 0))
+    for _ in range(4):
+        x, y, w = int(rnd.uniform(0, s * 0.7)), int(rnd.uniform(0, s * 0.7)), int(rnd.uniform(s * 0.1, s * 0.3))
+        t = max(1, s // 256)
+        for x0, y0, x1, y1 in ((x, y, x + w, y + t), (x, y + w, x + w, y + w + t), (x, y, x + t, y + w), (x + w, y, x + w + t, y + w + t)):
+            c.rect(x0, y0, x1, y1, (0, 0, 0))
+    return c
+
+def draw_strokes(rnd, s):
+    c = Canvas(s, s, (250, 246, 236))
+    for _ in range(8):
+        c.curve([_point(rnd, s) for _ in range(3)], rnd.uniform(s / 40, s / 15), (20, 20, 20), taper=True)
+    return c
+
+def draw_poster(rnd, s):
+    palette = [tuple(rnd.randrange(256) for _ in range(3)) for _ in range(6)]
+    c = Canvas(s, s, palette[0])
+    for _ in range(10):
+        x0, y0 = int(rnd.uniform(0, s)), int(rnd.uniform(0, s))
+        c.rect(x0, y0, x0 + int(rnd.uniform(s / 8, s / 2)), y0 + int(rnd.uniform(s / 8, s / 2)), rnd.choice(palette))
+    for _ in range(6):
+        c.disc(*_point(rnd, s), rnd.uniform(s / 20, s / 5), rnd.choice(palette))
+    return c
+
+def draw_photo(rnd, s):
+    c = Canvas(s, s)
+    # 平滑渐变 + 几个柔和光斑 + 逐像素噪声
+    blobs = [(*_point(rnd, s), rnd.uniform(s / 6, s / 2), [rnd.uniform(-120, 120) for _ in range(3)]) for _ in range(4)]
+    gauss, px = rnd.gauss, c.px
+    for y in range(s):
+        for x in range(s):
+            r, g, b = 90 + 80 * x / s, 110 + 60 * y / s, 160 - 70 * (x + y) / (2 * s)
+            for bx, by, br, (dr, dg, db) in blobs:
+                k = math.exp(-((x - bx) ** 2 + (y - by) ** 2) / (br * br))
+                r += dr * k; g += dg * k; b += db * k
+            n = gauss(0, 12)
+            i = (y * s + x) * 3
+            px[i], px[i + 1], px[i + 2] = (max(0, min(255, int(v + n))) for v in (r, g, b))
+    return c
+
+def draw_icon(rnd, s):
+    fg, bg = tuple(rnd.randrange(200) for _ in range(3)), (255, 255, 255)
+    c = Canvas(s, s, bg)
+    c.disc(s / 2, s / 2, s * 0.4, fg)
+    c.rect(int(s * 0.3), int(s * 0.45), int(s * 0.7), int(s * 0.55), bg)
+    return c
+
+KINDS = {"lineart": draw_lineart, "strokes": draw_strokes, "poster": draw_poster, "photo": draw_photo, "icon": draw_icon}
+
+def build_corpus(root, sizes=BENCH_SIZES, seed=BENCH_SEED, log=print):
+    """ 在 root 下生成图片集 (已存在的文件直接复用，内容只由 seed 与尺寸决定)。返回 {文件名: (类型, 像素数)} """
+    os.makedirs(root, exist_ok=True)
+    corpus = {}
+    for kind, draw in KINDS.items():
+        for s in (ICON_SIZES if kind == "icon" else sizes):
+            name = f"{kind}_{s}.png"
+            path = os.path.join(root, name)
+            if not os.path.exists(path):
+                c = draw(random.Random(f"{seed}:{kind}:{s}"), s)
+                write_png(path + ".tmp", c.w, c.h, c.px); os.replace(path + ".tmp", path)
+            corpus[name] = (kind, s * s)
+    log(f"图片集: {len(corpus)} 张 ({root})")
+    return corpus
+
+# === 运行与汇总 ===
+def bench_preset(corpus_dir, corpus, preset, options, repeat, work):
+    """ 用 run_batch 转换整个图片集 repeat 次。吞吐量取最快一次，耗时分位数取所有次的逐张记录 """
+    times, walls, records = [], [], {}
+    for i in range(repeat):
+        out = os.path.join(work, f"out{i}")
+        shutil.rmtree(out, ignore_errors=True)
+        t0 = time.perf_counter()
+        stats = run_batch(corpus_dir, out, make_params(preset), {**options, "force": True, "metrics": True}, log=lambda m: None)
+        walls.append(time.perf_counter() - t0)
+        with open(os.path.join(out, METRICS_NAME + ".jsonl"), 'r', encoding='utf-8') as f:
+            for line in f:
+                rec = json.loads(line)
+                if rec.get("time") is not None: times.append(rec["time"])
+                records[rec["file"]] = rec # 体积与峰值内存每次相同，保留最后一次
+    wall, pixels = min(walls), sum(px for _, px in corpus.values())
+    ok = [r for r in records.values() if r["status"] == "ok"]
+    by_kind = {}
+    for r in ok:
+        k = by_kind.setdefault(corpus[r["file"]][0], {"images": 0, "bytes": 0, "time": 0.0})
+        k["images"] += 1; k["bytes"] += r["bytes"]; k["time"] = round(k["time"] + (r.get("time") or 0), 4)
+    return {"images": len(corpus), "failed": stats["failed"], "wall": round(wall, 4),
+            "images_per_s": round(len(corpus) / wall, 3), "mpix_per_s": round(pixels / wall / 1e6, 3),
+            "p50": percentile(times, 50), "p95": percentile(times, 95), "p99": percentile(times, 99),
+            "bytes": sum(r["bytes"] for r in ok), "elements": sum(r.get("elements", 0) for r in ok),
+            "peak_rss": max((r["rss"] or 0 for r in records.values()), default=0) or None, "by_kind": by_kind}
+
+def run_bench(corpus_dir, presets=None, options=None, sizes=BENCH_SIZES, repeat=1, log=print):
+    """ 生成图片集并逐个预设测量，返回结果字典 (可直接写为 JSON) """
+    opts = {**DEFAULT_OPTIONS, **(options or {})}
+    corpus = build_corpus(corpus_dir, sizes, log=log)
+    result = {"version": RESULT_VERSION, "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+              "config": {"engine": opts["engine"], "workers": opts["workers"], "sizes": list(sizes), "repeat": repeat, "seed": BENCH_SEED},
+              "corpus": {"images": len(corpus), "pixels": sum(px for _, px in corpus.values())}, "presets": {}}
+    work = tempfile.mkdtemp(prefix="pictosvg_bench_")
+    try:
+        for name in presets or PRESETS:
+            r = bench_preset(corpus_dir, corpus, name, opts, repeat, work)
+            result["presets"][name] = r
+            log(f"{name}: {r['images_per_s']} 张/s, {r['mpix_per_s']} MP/s, p50 {r['p50'] or 0:.3f}s / p95 {r['p95'] or 0:.3f}s, "
+                f"{format_bytes(r['bytes'])}, 峰值内存 {format_bytes(r['peak_rss']) if r['peak_rss'] else '-'}" + (f", 失败 {r['failed']}" if r["failed"] else ""))
+    finally: shutil.rmtree(work, ignore_errors=True)
+    return result
+
+def compare(result, baseline, tolerance=BENCH_TOLERANCE):
+    """ 与基线逐预设对比，返回回退项列表 [(预设, 指标, 基线值, 当前值, 变化比例)]。新增失败总是视为回退 """
+    regressions = []
+    for name, cur in result["presets"].items():
+        base = baseline.get("presets", {}).get(name)
+        if not base: continue
+        if cur["failed"] > base.get("failed", 0): regressions.append((name, "failed", base.get("failed", 0), cur["failed"], None))
+        for key, higher_better in COMPARE_METRICS.items():
+            b, c = base.get(key), cur.get(key)
+            if not b or c is None: continue
+            change = (c - b) / b
+            if (-change if higher_better else change) > tolerance: regressions.append((name, key, b, c, round(change, 4)))
+    return regressions
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="pictosvg-bench", description="PicToSvg 基准测试")
+    ap.add_argument("-o", "--output", help="结果 JSON 路径 (默认打印到标准输出)")
+    ap.add_argument("--corpus", help="图片集目录 (默认临时目录；指定后可在多次运行间复用)")
+    ap.add_argument("--sizes", default=",".join(map(str, BENCH_SIZES)), help="线稿/笔画/海报/照片的边长，逗号分隔")
+    ap.add_argument("--preset", action="append", default=[], help="只测这些预设 (可重复，英文名即可)，默认全部")
+    ap.add_argument("--repeat", type=int, default=1, help="每个预设重复次数，吞吐量取最快一次")
+    ap.add_argument("-j", "--workers", type=int, default=DEFAULT_OPTIONS["workers"], help="并发数")
+    ap.add_argument("--engine", choices=ENGINES, default=DEFAULT_OPTIONS["engine"], help="转换引擎")
+    ap.add_argument("--vtracer", help="vtracer 可执行文件路径")
+    ap.add_argument("--baseline", help="与此基线 JSON 对比，出现回退时退出码为 1")
+    ap.add_argument("--save-baseline", metavar="PATH", help="把本次结果另存为基线")
+    ap.add_argument("--tolerance", type=float, default=BENCH_TOLERANCE, help="允许的相对退化比例 (默认 0.10)")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    a = parse_args(argv)
+    log = lambda m: print(m, file=sys.stderr, flush=True)
+    try: sizes = tuple(int(s) for s in a.sizes.split(",") if s.strip())
+    except ValueError as e: print(f"参数错误: {e}", file=sys.stderr); return 2
+    presets = [find_preset(p) for p in a.preset]
+    if any(p not in PRESETS for p in presets): print(f"未知预设: {', '.join(a.preset)}", file=sys.stderr); return 2
+    corpus_dir = a.corpus or tempfile.mkdtemp(prefix="pictosvg_corpus_")
+    try:
+        result = run_bench(corpus_dir, presets, {"workers": a.workers, "engine": a.engine, "exe": a.vtracer}, sizes, max(1, a.repeat), log)
+    finally:
+        if not a.corpus: shutil.rmtree(corpus_dir, ignore_errors=True)
+    code = 0
+    if a.baseline:
+        with open(a.baseline, 'r', encoding='utf-8') as f: baseline = json.load(f)
+        if baseline.get("config", {}).get("sizes") != result["config"]["sizes"]: log("注意: 基线的图片集尺寸与本次不同，对比结果仅供参考")
+        result["regressions"] = [dict(zip(("preset", "metric", "baseline", "current", "change"), r)) for r in compare(result, baseline, a.tolerance)]
+        for r in result["regressions"]:
+            log(f"⚠ 回退 {r['preset']} {r['metric']}: {r['baseline']} → {r['current']}" + (f" ({r['change']:+.1%})" if r["change"] is not None else ""))
+        if not result["regressions"]: log(f"与基线相比无超过 {a.tolerance:.0%} 的回退")
+        code = 1 if result["regressions"] else 0
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if a.output:
+        with open(a.output, 'w', encoding='utf-8') as f: f.write(text)
+    else: print(text)
+    if a.save_baseline:
+        with open(a.save_baseline, 'w', encoding='utf-8') as f: f.write(text)
+    return code
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
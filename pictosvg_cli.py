@@ -0,0 +1,106 @@
+""" PicToSvg 命令行入口 (无界面批量转换，不导入 tkinter)
+
+用法: python -m pictosvg_cli 输入文件夹 [-o 输出文件夹] [--preset bw] [--params '{"filter_speckle": 8}'] [-r] [--delete] [--watch]
+归档: 输入或输出 (-o) 可为 .zip / .tar / .tar.gz 等归档，直接读写而不解压，如 pictosvg_cli 图片.zip -o 结果.zip
+多机分片: 各节点运行 ... --shard 1/4 ... --shard 4/4 (共享同一输出文件夹)，全部完成后 ... --merge-shards 合并报告
+"""
+import argparse
+import json
+import os
+import multiprocessing
+import signal
+import sys
+import threading
+from pictosvg_core import PRESETS, AUTO_PRESET, DEFAULT_OPTIONS, ENGINES, SUMMARY_NAME, find_preset, make_params, run_batch, parse_shard, merge_shard_summaries
+from pictosvg_watch import watch
+from pictosvg_archive import ARCHIVE_EXTS, archive_ext, is_archive, run_archive
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="pictosvg", description="PicToSvg 图片批量转矢量 (命令行版)")
+    ap.add_argument("input", help="输入文件夹，或 ZIP/TAR 归档")
+    ap.add_argument("-o", "--output", help="输出文件夹或归档 (" + ", ".join(ARCHIVE_EXTS) + ")；默认: 输入文件夹/output，归档输入为 名称_svg.扩展名")
+    ap.add_argument("-p", "--preset", help="预设名称，可用括号内英文名: " + ", ".join(PRESETS) + "；auto 为逐个文件自动选择 (需要 Pillow 与 NumPy)")
+    ap.add_argument("--params", help="JSON 参数覆盖，如 '{\"filter_speckle\": 8}'，或 @文件路径")
+    ap.add_argument("-r", "--recursive", action="store_true", help="处理子文件夹")
+    ap.add_argument("--delete", action="store_true", help="处理成功后删除原文件")
+    ap.add_argument("-j", "--workers", type=int, default=DEFAULT_OPTIONS["workers"], help="并发数 (默认 CPU 核数)")
+    ap.add_argument("--engine", choices=ENGINES, default=DEFAULT_OPTIONS["engine"], help="转换引擎")
+    ap.add_argument("--force", action="store_true", help="忽略增量清单，全部重新转换")
+    ap.add_argument("--include", action="append", default=[], metavar="GLOB", help="只处理匹配的文件 (可重复)，如 '*.png'")
+    ap.add_argument("--exclude", action="append", default=[], metavar="GLOB", help="跳过匹配的文件或文件夹 (可重复)，如 'tmp/*'")
+    ap.add_argument("--metrics", action="store_true", help="在输出目录写出逐文件性能数据 (pictosvg_metrics.jsonl/.csv) 并打印汇总")
+    ap.add_argument("--timeout", type=float, default=0, help="单个任务超时秒数 (0=不限)")
+    ap.add_argument("--mem-limit", type=int, default=0, metavar="MB", help="单个任务内存上限 MB (0=不限，仅 Linux/macOS)")
+    ap.add_argument("--retries", type=int, default=DEFAULT_OPTIONS["retries"], help="超时/超内存后使用降级参数重试的次数")
+    ap.add_argument("--max-pixels", type=int, default=0, help="预处理: 像素数上限，超过则缩小 (需要 Pillow)")
+    ap.add_argument("--max-edge", type=int, default=0, help="预处理: 长边上限像素")
+    ap.add_argument("--denoise", type=int, default=0, help="预处理: 中值滤波窗口大小 (如 3)")
+    ap.add_argument("--colors", type=int, default=0, help="预处理: 预量化到 N 种颜色")
+    ap.add_argument("--tile-pixels", type=int, default=DEFAULT_OPTIONS["tile_pixels"], help="像素数超过该值的图片自动分块转换 (0=关闭，需要 Pillow)")
+    ap.add_argument("--tile-size", type=int, default=DEFAULT_OPTIONS["tile_size"], help="分块边长")
+    ap.add_argument("--tile-overlap", type=int, default=DEFAULT_OPTIONS["tile_overlap"], help="分块之间的重叠像素")
+    ap.add_argument("--optimize", action="store_true", help="后处理优化 SVG (坐标取整、相对命令、合并同色路径)")
+    ap.add_argument("--precision", type=int, default=DEFAULT_OPTIONS["opt_precision"], help="优化后保留的小数位数")
+    ap.add_argument("--svgz", action="store_true", help="输出 gzip 压缩的 .svgz")
+    ap.add_argument("--dedupe", choices=("content", "pixels"), help="相同图片只转换一次: content 按文件内容，pixels 按解码后像素 (需要 Pillow)")
+    ap.add_argument("--resume", action="store_true", help="继续上次中断的运行：跳过运行记录中已完成或已失败的文件")
+    ap.add_argument("--watch", action="store_true", help="持续监视输入文件夹，新增或修改的图片写入完成后自动转换 (Ctrl+C 结束)")
+    ap.add_argument("--poll", action="store_true", help="监视时使用轮询而非 inotify")
+    ap.add_argument("--shard", metavar="i/N", help="多机分片：只处理按相对路径哈希分到第 i 片 (共 N 片) 的文件，并写出分片汇总")
+    ap.add_argument("--merge-shards", action="store_true", help="不转换，把输出文件夹中各分片的汇总合并为 " + SUMMARY_NAME)
+    ap.add_argument("--vtracer", help="vtracer 可执行文件路径")
+    return ap.parse_args(argv)
+
+def load_overrides(text):
+    if not text: return {}
+    if text.startswith("@"):
+        with open(text[1:], 'r', encoding='utf-8') as f: return json.load(f)
+    return json.loads(text)
+
+def merge(out_dir):
+    try: report = merge_shard_summaries(out_dir)
+    except (ValueError, OSError) as e: print(f"合并失败: {e}", file=sys.stderr); return 2
+    st = report["stats"]
+    print(f"合并 {report['shards'] - len(report['missing'])}/{report['shards']} 个分片: 成功 {st.get('success', 0)}，失败 {st.get('failed', 0)}，"
+          f"跳过 {st.get('skipped', 0) + st.get('reused', 0) + st.get('resumed', 0)}")
+    if report["missing"]: print(f"缺少分片: {', '.join(map(str, report['missing']))}")
+    if report["args_mismatch"]: print("注意: 各分片的转换参数不一致")
+    for f in report["failures"]: print(f"  ❌ {f['file']} ({f['error']})")
+    print(f"报告已写入 {os.path.join(out_dir, SUMMARY_NAME)}")
+    return 1 if report["failures"] or report["missing"] else 0
+
+def main(argv=None):
+    a = parse_args(argv)
+    if a.merge_shards: return merge(a.output or os.path.join(a.input, "output"))
+    try: shard = parse_shard(a.shard) if a.shard else None
+    except ValueError as e: print(f"参数错误: {e}", file=sys.stderr); return 2
+    try: overrides = load_overrides(a.params); params = make_params(a.preset, overrides)
+    except (ValueError, OSError) as e: print(f"参数错误: {e}", file=sys.stderr); return 2
+    archive = is_archive(a.input) or bool(a.output and is_archive(a.output))
+    if not os.path.isdir(a.input) and not (is_archive(a.input) and os.path.isfile(a.input)): print(f"找不到输入文件夹或归档: {a.input}", file=sys.stderr); return 2
+    if archive and a.watch: print("监视模式不支持归档输入/输出", file=sys.stderr); return 2
+    if is_archive(a.input):
+        ext = archive_ext(a.input)
+        out_dir = a.output or a.input[:-len(ext)] + "_svg" + ext
+    else: out_dir = a.output or os.path.join(a.input, "output")
+    options = {"recursive": a.recursive, "delete": a.delete, "workers": a.workers, "engine": a.engine, "force": a.force, "exe": a.vtracer,
+               "include": a.include, "exclude": a.exclude, "metrics": a.metrics,
+               "timeout": a.timeout, "mem_limit": a.mem_limit, "retries": a.retries,
+               "max_pixels": a.max_pixels, "max_edge": a.max_edge, "denoise": a.denoise, "colors": a.colors,
+               "tile_pixels": a.tile_pixels, "tile_size": a.tile_size, "tile_overlap": a.tile_overlap,
+               "optimize": a.optimize, "opt_precision": a.precision, "svgz": a.svgz,
+               "dedupe": a.dedupe or "", "auto": bool(a.preset) and find_preset(a.preset) == AUTO_PRESET, "overrides": overrides,
+               "resume": a.resume, "shard": shard}
+    log = lambda m: print(m, flush=True)
+    if a.watch:
+        # Ctrl+C / SIGTERM 只通知停止，已提交的任务完成并保存清单后再退出
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM): signal.signal(sig, lambda *_: stop.set())
+        stats = watch(a.input, out_dir, params, options, log=log, stop=stop, poll=a.poll)
+    elif archive: stats = run_archive(a.input, out_dir, params, options, log=log)
+    else: stats = run_batch(a.input, out_dir, params, options, log=log)
+    return 1 if stats["failed"] else 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,1056 @@
+""" PicToSvg 转换核心：参数、引擎与批量流水线 (不依赖 tkinter，可供命令行/服务端直接导入) """
+import os
+import json
+import subprocess
+import sys
+import hashlib
+import shutil
+import heapq
+import queue
+import threading
+import fnmatch
+import struct
+import time
+import csv
+import tempfile
+import platform
+import re
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import io
+import gzip
+import math
+try: import vtracer # vtracer Python 绑定 (可选，未安装时使用命令行引擎)
+except ImportError: vtracer = None
+try:
+    from PIL import Image, ImageFilter # Pillow (可选，用于预处理与分块)
+    Image.MAX_IMAGE_PIXELS = None # 本地批量工具，允许处理超大扫描图
+except ImportError: Image = ImageFilter = None
+try: import numpy as np # NumPy (可选，用于自动预设的图像分析)
+except ImportError: np = None
+try: import resource # 仅 POSIX：子进程内存上限与峰值内存
+except ImportError: resource = None
+from pictosvg_svg import rescale_svg, stitch_svgs, optimize_svg
+
+# === 全局配置 ===
+EXECUTABLE_NAME = "vtracer.exe" if os.name == 'nt' else "vtracer"
+CPU_COUNT = os.cpu_count() or 1 # 默认并发数
+MANIFEST_NAME = ".pictosvg_manifest.json" # 输出目录中的增量转换清单
+METRICS_NAME = "pictosvg_metrics" # 性能数据文件名 (.jsonl / .csv)
+JOURNAL_NAME = ".pictosvg_journal.jsonl" # 输出目录中的运行记录 (断点续传)
+JOURNAL_SYNC = 1.0 # 运行记录落盘 (fsync) 的最小间隔 (秒)
+SUMMARY_NAME = "pictosvg_summary.json" # 分片运行的汇总报告 (每个分片一份，合并后为一份)
+
+# === 核心：资源路径获取 (关键修改：支持打包后的资源读取) ===
+def resource_path(relative_path):
+    """ 获取资源绝对路径，兼容开发环境和打包后的环境 """
+    if getattr(sys, 'frozen', False):
+        # PyInstaller 打包后的临时目录
+        base_path = sys._MEIPASS
+    else:
+        # 开发环境
+        base_path = os.getcwd()
+    return os.path.join(base_path, relative_path)
+
+# === 预设参数 ===
+PRESETS = {
+    "默认 (Default)": {
+        "colormode": "color", "hierarchical": "stacked", "mode": "spline",
+        "filter_speckle": 4, "color_precision": 6, "gradient_step": 16,
+        "corner_threshold": 60, "segment_length": 5.0, "splice_threshold": 45, "path_precision": 8
+    },
+    "毛笔字 (Calligraphy)": {
+        "colormode": "bw", "hierarchical": "stacked", "mode": "spline",
+        "filter_speckle": 2, "color_precision": 8, "gradient_step": 16,
+        "corner_threshold": 45, "segment_length": 3.5, "splice_threshold": 30, "path_precision": 6
+    },
+    "黑白 (BW)": {
+        "colormode": "bw", "hierarchical": "stacked", "mode": "spline",
+        "filter_speckle": 4, "color_precision": 6, "gradient_step": 16,
+        "corner_threshold": 60, "segment_length": 5.0, "splice_threshold": 45, "path_precision": 8
+    },
+    "海报 (Poster)": {
+        "colormode": "color", "hierarchical": "stacked", "mode": "spline",
+        "filter_speckle": 8, "color_precision": 8, "gradient_step": 64,
+        "corner_threshold": 60, "segment_length": 5.0, "splice_threshold": 45, "path_precision": 8
+    },
+    "照片 (Photo)": {
+        "colormode": "color", "hierarchical": "stacked", "mode": "spline",
+        "filter_speckle": 2, "color_precision": 8, "gradient_step": 16,
+        "corner_threshold": 180, "segment_length": 3.5, "splice_threshold": 180, "path_precision": 10
+    }
+}
+
+PARAM_KEYS = list(PRESETS["默认 (Default)"].keys())
+AUTO_PRESET = "自动 (Auto)" # 逐个文件分析图像后从 PRESETS 中选择
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
+
+# === 参数映射 (命令行与 Python 引擎共用，保证两者输出一致) ===
+# 参数名: (命令行参数, Python API 参数名, 生效条件)
+PARAM_MAP = {
+    "colormode":        ("--colormode", "colormode", lambda p: True),
+    "mode":             ("--mode", "mode", lambda p: True),
+    "filter_speckle":   ("--filter_speckle", "filter_speckle", lambda p: True),
+    "path_precision":   ("--path_precision", "path_precision", lambda p: True),
+    "color_precision":  ("--color_precision", "color_precision", lambda p: p["colormode"] == 'color'),
+    "gradient_step":    ("--gradient_step", "layer_difference", lambda p: p["colormode"] == 'color'),
+    "hierarchical":     ("--hierarchical", "hierarchical", lambda p: p["colormode"] == 'color'),
+    "corner_threshold": ("--corner_threshold", "corner_threshold", lambda p: p["mode"] != 'pixel'),
+    "segment_length":   ("--segment_length", "length_threshold", lambda p: p["mode"] != 'pixel'),
+    "splice_threshold": ("--splice_threshold", "splice_threshold", lambda p: p["mode"] == 'spline'),
+}
+ENGINES = ("cli", "python")
+
+def active_params(p):
+    """ 当前模式下实际生效的参数 """
+    return {k: p[k] for k, (_, _, cond) in PARAM_MAP.items() if cond(p)}
+
+def build_cmd(exe, fp, out_p, p):
+    """ 根据参数字典构建 vtracer 命令行 """
+    cmd = [exe, "--input", fp, "--output", out_p]
+    for k, v in active_params(p).items(): cmd.extend([PARAM_MAP[k][0], str(v)])
+    return cmd
+
+PY_VALUES = {"colormode": {"bw": "binary"}} # Python API 与命令行取值不同的参数
+
+def build_py_kwargs(p):
+    """ 根据参数字典构建 vtracer Python API 关键字参数 """
+    return {PARAM_MAP[k][1]: PY_VALUES.get(k, {}).get(v, v) for k, v in active_params(p).items()}
+
+def resolve_engine(engine):
+    """ 选择的引擎不可用时回退到命令行引擎 """
+    return "python" if engine == "python" and vtracer is not None else "cli"
+
+def _maxrss_bytes(ru):
+    return ru.ru_maxrss * (1 if sys.platform == 'darwin' else 1024) # macOS 单位为字节，Linux 为 KB
+
+def _ulimit_cmd(cmd, mem_limit):
+    """ 没有 prlimit (如 macOS) 时由 shell 先设置 ulimit 再 exec 目标程序；系统不支持该上限时照常运行 """
+    return ["/bin/sh", "-c", f'ulimit -v {mem_limit // 1024} 2>/dev/null; exec "$0" "$@"', *cmd]
+
+def run_vtracer(cmd, timeout=None, mem_limit=None):
+    """ 运行单个 vtracer 任务 (可在线程池中并发调用)，返回 {"code", "rss", "error", "timeout"}。
+    timeout 秒后强制结束；mem_limit 为地址空间上限 (字节，仅 POSIX)。
+    POSIX 下用 wait4 回收子进程，得到该子进程自身的峰值内存 """
+    startup = None
+    # 不使用 preexec_fn：线程池中并发 fork 时它并不安全。Linux 在启动后用 prlimit 设置上限
+    use_prlimit = bool(mem_limit and resource and hasattr(resource, "prlimit"))
+    if os.name == 'nt': startup = subprocess.STARTUPINFO(); startup.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    elif mem_limit and not use_prlimit: cmd = _ulimit_cmd(cmd, mem_limit)
+    rss, state, lock = None, {"done": False, "timeout": False}, threading.Lock()
+    with tempfile.TemporaryFile() as errf: # stderr 写入临时文件，等待期间不会因管道写满而阻塞
+        p = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=errf, startupinfo=startup)
+        if use_prlimit:
+            try: resource.prlimit(p.pid, resource.RLIMIT_AS, (mem_limit, mem_limit))
+            except (OSError, ValueError): pass # 子进程已退出
+        if hasattr(os, "waitid"):
+            def kill():
+                with lock:
+                    if not state["done"]: state["timeout"] = True; p.kill()
+            timer = threading.Timer(timeout, kill) if timeout else None
+            if timer: timer.daemon = True; timer.start()
+            # 先等待退出但不回收，避免计时器误杀已被回收后复用的 pid
+            os.waitid(os.P_PID, p.pid, os.WEXITED | os.WNOWAIT)
+            with lock: state["done"] = True
+            if timer: timer.cancel()
+            _, status, ru = os.wait4(p.pid, 0)
+            p.returncode, rss = os.waitstatus_to_exitcode(status), _maxrss_bytes(ru)
+        elif hasattr(os, "wait4"):
+            # macOS 没有 waitid：轮询 wait4，超时由本线程在回收之前结束子进程
+            deadline, delay = time.monotonic() + timeout if timeout else None, 0.001
+            while True:
+                pid, status, ru = os.wait4(p.pid, os.WNOHANG)
+                if pid: break
+                if deadline and not state["timeout"] and time.monotonic() >= deadline: state["timeout"] = True; p.kill()
+                time.sleep(delay); delay = min(0.05, delay * 2)
+            p.returncode, rss = os.waitstatus_to_exitcode(status), _maxrss_bytes(ru)
+        else:
+            try: p.wait(timeout=timeout)
+            except subprocess.TimeoutExpired: state["timeout"] = True; p.kill(); p.wait()
+        errf.seek(0)
+        err = errf.read().decode('utf-8', 'replace').strip()
+    return {"code": p.returncode, "rss": rss, "error": err.splitlines()[-1] if err else "", "timeout": state["timeout"]}
+
+def convert_py(src, out_p, kwargs):
+    """ 在工作进程内直接调用 vtracer Python API，省去每张图的进程启动开销。
+    src 为文件路径或内存中的 PNG 数据。rss 为工作进程迄今的峰值内存 (同一进程内无法区分单个任务) """
+    if isinstance(src, bytes):
+        with open(out_p, 'w', encoding='utf-8') as f: f.write(vtracer.convert_raw_image_to_svg(src, img_format="png", **kwargs))
+    else: vtracer.convert_image_to_svg_py(src, out_p, **kwargs)
+    rss = _maxrss_bytes(resource.getrusage(resource.RUSAGE_SELF)) if resource else None
+    return {"code": 0, "rss": rss, "error": ""}
+
+def degrade_params(p, level):
+    """ 第 level 级降级参数：逐级降低色彩精度，增大去噪强度与渐变步长 """
+    p = dict(p)
+    p["color_precision"] = max(1, p["color_precision"] - 2 * level)
+    p["filter_speckle"] = min(16, max(p["filter_speckle"], 4) * 2 ** level)
+    p["gradient_step"] = min(255, max(p["gradient_step"], 16) * 2 ** level)
+    return normalize_params(p)
+
+def describe_fallback(p, level):
+    return f"降级参数{level}: 色彩精度 {p['color_precision']}, 去噪 {p['filter_speckle']}, 渐变步长 {p['gradient_step']}"
+
+# === 矢量化前预处理 (需要 Pillow) ===
+def preprocess_image(fp, max_pixels=0, max_edge=0, denoise=0, colors=0):
+    """ 按需缩小、中值去噪、预量化颜色。无需处理时返回 None，否则返回 (处理后的图片, 原始尺寸) """
+    if Image is None or not (max_pixels or max_edge or denoise or colors): return None
+    img = Image.open(fp)
+    w, h = img.size
+    scale = 1.0
+    if max_pixels and w * h > max_pixels: scale = math.sqrt(max_pixels / (w * h))
+    if max_edge and max(w, h) * scale > max_edge: scale = max_edge / max(w, h)
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    if scale >= 1 and not denoise and not colors: return None
+    if scale < 1:
+        img.draft("RGB", size) # JPEG 可在解码时直接按比例缩小
+        img = img.resize(size, Image.LANCZOS)
+    if img.mode not in ("RGB", "RGBA"): img = img.convert("RGBA")
+    if denoise: img = img.filter(ImageFilter.MedianFilter(int(denoise) | 1))
+    if colors: img = img.quantize(int(colors), method=Image.FASTOCTREE).convert(img.mode)
+    return img, (w, h)
+
+# === 自动预设 (需要 Pillow 与 NumPy) ===
+ANALYZE_EDGE = 96 # 分析用缩略图的长边像素
+
+def analyze_image(src):
+    """ 在缩略图上统计颜色特征：覆盖 95% 像素所需的颜色数、平均饱和度、是否近似双色 (两种颜色占 90% 以上)。
+    src 为文件路径或已打开的图片 """
+    if isinstance(src, str):
+        with Image.open(src) as img: return analyze_image(img)
+    w, h = src.size
+    scale = min(1.0, ANALYZE_EDGE / max(w, h, 1))
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    src.draft("RGB", size) # JPEG 解码时直接缩小 (仅对尚未解码的文件生效)
+    a = np.asarray(src.resize(size, Image.NEAREST).convert("RGBA"), dtype=np.float32).reshape(-1, 4)
+    alpha = a[:, 3:] / 255
+    rgb = a[:, :3] * alpha + 255 * (1 - alpha) # 透明区域按白色背景计
+    hi, lo = rgb.max(axis=1), rgb.min(axis=1)
+    sat = float(np.mean(np.where(hi > 0, (hi - lo) / np.maximum(hi, 1), 0)))
+    q = rgb.astype(np.uint16) >> 4 # 每通道 16 级
+    counts = np.bincount((q[:, 0] << 8 | q[:, 1] << 4 | q[:, 2]).astype(np.intp), minlength=4096)
+    top = np.cumsum(np.sort(counts)[::-1])
+    n = len(rgb)
+    return {"colors": int(np.searchsorted(top, 0.95 * n)) + 1, "saturation": round(sat, 3), "two_tone": bool(top[1] >= 0.9 * n)}
+
+def pick_preset(stats):
+    """ 根据 analyze_image 的结果选择 PRESETS 中的预设 """
+    if stats["two_tone"] and stats["saturation"] < 0.1: return "黑白 (BW)"
+    if stats["colors"] <= 24: return "海报 (Poster)"
+    if stats["colors"] >= 200: return "照片 (Photo)"
+    return "默认 (Default)"
+
+def auto_params(src, overrides=None):
+    """ 分析图片并返回 (预设名, 参数)，overrides 中的参数优先 """
+    name = pick_preset(analyze_image(src))
+    return name, normalize_params({**PRESETS[name], **(overrides or {})})
+
+def _png_bytes(img):
+    buf = io.BytesIO()
+    img.save(buf, "PNG", compress_level=1)
+    return buf.getvalue()
+
+def convert_job(fp, out_p, params, cfg):
+    """ 转换单个文件并采集性能数据 (模块级函数，可提交到进程池)。
+    cfg 见 job_config。超时或超出内存被结束时，最多 retries 次使用更廉价的降级参数重试。
+    结果先写入同目录的临时文件，落盘后再原子替换为 out_p，中断时不会留下截断的 SVG """
+    work, t0 = temp_output(out_p), time.perf_counter()
+    try:
+        res = _convert_to(fp, work, params, cfg)
+        if res["code"] == 0:
+            try: commit_file(work, out_p); res.update(svg_stats(out_p))
+            except OSError as e: res.update(code=-1, error=f"写入输出失败: {str(e).replace(work, out_p)}")
+    except Exception as e:
+        # 后处理 (解码、解析、缩放还原等) 出错时作为失败结果返回，错误信息中不出现隐藏的临时文件名
+        res = {"code": -1, "rss": None, "error": f"{type(e).__name__}: {str(e).replace(work, out_p)}", "time": round(time.perf_counter() - t0, 4)}
+        res["width"], res["height"] = image_size(fp)
+    finally: discard(work)
+    return res
+
+def _convert_to(fp, out_p, params, cfg):
+    engine = cfg["engine"]
+    t0 = time.perf_counter()
+    src, img, orig, tmp = fp, None, None, None
+    width, height = image_size(fp)
+    try:
+        pre = preprocess_image(fp, cfg["max_pixels"], cfg["max_edge"], cfg["denoise"], cfg["colors"])
+    except Exception as e: pre = None; pre_err = f"预处理失败: {e}"
+    else: pre_err = ""
+    if pre: img, orig = pre
+    choice = None
+    if cfg["auto"] and Image and np is not None:
+        try: choice, params = auto_params(img or fp, cfg["overrides"])
+        except Exception: pass # 分析失败时沿用传入的参数
+    work_w, work_h = img.size if img else (width, height)
+    tiled = bool(Image and cfg["tile_pixels"] and work_w and work_h and work_w * work_h > cfg["tile_pixels"])
+    try:
+        if tiled: res = _convert_tiled(img or Image.open(fp), out_p, params, cfg)
+        else:
+            if img:
+                # Python 引擎直接在内存中交给 vtracer，命令行引擎写入临时文件
+                if engine == "python": src = _png_bytes(img)
+                else:
+                    fd, tmp = tempfile.mkstemp(suffix=".png"); os.close(fd)
+                    img.save(tmp, "PNG", compress_level=1); src = tmp
+            res = _convert_with_fallback(src, out_p, params, cfg)
+        if res["code"] == 0 and not os.path.exists(out_p): res.update(code=-1, error="vtracer 未生成输出文件")
+    finally:
+        if tmp:
+            try: os.remove(tmp)
+            except OSError: pass
+    if res["code"] == 0 and orig:
+        # 缩小后生成的 SVG 还原为原图尺寸
+        with open(out_p, 'r', encoding='utf-8') as f: svg = f.read()
+        with open(out_p, 'w', encoding='utf-8') as f: f.write(rescale_svg(svg, *orig))
+    if res["code"] == 0 and (cfg["optimize"] or cfg["svgz"]):
+        res["raw_bytes"] = os.path.getsize(out_p)
+        postprocess_svg(out_p, cfg["optimize"], cfg["opt_precision"], cfg["svgz"])
+    res["time"] = round(time.perf_counter() - t0, 4)
+    res["width"], res["height"] = width, height
+    res["preprocessed"] = f"{work_w}x{work_h}" if pre else pre_err
+    if choice: res["preset"] = choice
+    return res
+
+# === 超大图分块转换 ===
+def tile_grid(width, height, size, overlap):
+    """ 返回 [(裁剪框, 核心区)]：核心区互不重叠地铺满整图，裁剪框在核心区外扩 overlap 像素供 vtracer 参考边缘 """
+    tiles = []
+    for y in range(0, height, size):
+        for x in range(0, width, size):
+            core = (x, y, min(width, x + size), min(height, y + size))
+            box = (max(0, x - overlap), max(0, y - overlap), min(width, core[2] + overlap), min(height, core[3] + overlap))
+            tiles.append((box, core))
+    return tiles
+
+def _convert_tiled(img, out_p, params, cfg):
+    """ 把大图切成重叠分块并行矢量化，再拼接为一个 SVG，单个 vtracer 任务的内存与整图大小无关 """
+    width, height = img.size
+    grid = tile_grid(width, height, cfg["tile_size"], cfg["tile_overlap"])
+    tmpdir = tempfile.mkdtemp(prefix="pictosvg_tiles_")
+    try:
+        if img.mode not in ("RGB", "RGBA"): img = img.convert("RGBA")
+        jobs = []
+        for i, (box, core) in enumerate(grid):
+            src = os.path.join(tmpdir, f"{i}.png")
+            img.crop(box).save(src, "PNG", compress_level=1)
+            jobs.append((src, os.path.join(tmpdir, f"{i}.svg")))
+        img.close(); del img # 分块已写盘，先释放整图再启动 vtracer
+        with ThreadPoolExecutor(max_workers=min(len(jobs), cfg["run_slots"])) as pool:
+            results = list(pool.map(lambda j: _convert_with_fallback(j[0], j[1], params, cfg), jobs))
+        failed = [r for r in results if r["code"] != 0]
+        res = dict(failed[0] if failed else results[0])
+        res["rss"] = max((r["rss"] or 0 for r in results), default=0) or None
+        res["timeout"] = any(r.get("timeout") for r in results)
+        res["oom"] = any(r.get("oom") for r in results)
+        res["fallback"] = next((r["fallback"] for r in results if r.get("fallback")), "")
+        res["tiles"] = len(jobs)
+        if failed: return res
+        parts = []
+        for (box, core), (_, svg_p) in zip(grid, jobs):
+            with open(svg_p, 'r', encoding='utf-8') as f: parts.append((f.read(), box[0], box[1], core))
+        with open(out_p, 'w', encoding='utf-8') as f: f.write(stitch_svgs(parts, width, height))
+        return res
+    finally: shutil.rmtree(tmpdir, ignore_errors=True)
+
+_slots, _slots_size, _slots_lock = None, 0, threading.Lock()
+
+def _run_slots(n):
+    """ 进程内共享的转换名额：普通任务与分块任务的 vtracer 调用合计不超过 n 个。
+    分块任务本身不占名额，只在等待各分块，避免每张大图再开 workers 个进程 (workers² 个并发) """
+    global _slots, _slots_size
+    with _slots_lock:
+        if _slots is None or _slots_size != n: _slots, _slots_size = threading.BoundedSemaphore(n), n
+        return _slots
+
+def _convert_with_fallback(src, out_p, params, cfg):
+    engine, timeout, mem_limit = cfg["engine"], cfg["timeout"], cfg["mem_limit"]
+    slots = _run_slots(cfg["run_slots"])
+    for level in range(cfg["retries"] + 1):
+        p = degrade_params(params, level) if level else params
+        ran = False # 结果来自 vtracer 子进程，而不是启动失败等异常
+        try:
+            with slots:
+                if engine == "python": res = convert_py(src, out_p, build_py_kwargs(p))
+                else: res = run_vtracer(build_cmd(cfg["exe"], src, out_p, p), timeout, mem_limit); ran = True
+        except MemoryError as e: res = {"code": -1, "rss": None, "error": f"内存不足 {e}", "oom": True}
+        except Exception as e: res = {"code": -1, "rss": None, "error": str(e)}
+        # 内存上限只施加于子进程：子进程被信号结束 (分配失败 abort/被 kill) 或报告内存分配失败视为超出内存
+        if ran and mem_limit and not res["timeout"]:
+            res["oom"] = res["code"] < 0 or any(k in res["error"].lower() for k in ("memory allocation", "out of memory", "memoryerror"))
+        else: res["oom"] = bool(res.get("oom"))
+        res["fallback"] = describe_fallback(p, level) if level else ""
+        if res["code"] == 0 or not (res.get("timeout") or res["oom"]): break
+    return res
+
+# === 图片格式与尺寸 (只读取文件头，不依赖 Pillow) ===
+def sniff_image(head):
+    """ 按文件头识别图片格式，返回对应扩展名 (如 ".png")，无法识别时返回 None """
+    if head.startswith(b'\x89PNG'): return ".png"
+    if head[:6] in (b'GIF87a', b'GIF89a'): return ".gif"
+    if head.startswith(b'BM'): return ".bmp"
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP': return ".webp"
+    if head.startswith(b'\xff\xd8'): return ".jpg"
+    return None
+
+def image_size(fp):
+    """ 返回 (宽, 高)，无法识别时返回 (None, None) """
+    try:
+        with open(fp, 'rb') as f:
+            head = f.read(32)
+            kind = sniff_image(head)
+            if kind == ".png": return struct.unpack(">II", head[16:24])
+            if kind == ".gif": return struct.unpack("<HH", head[6:10])
+            if kind == ".bmp":
+                w, h = struct.unpack("<ii", head[18:26]); return w, abs(h)
+            if kind == ".webp":
+                chunk = head[12:16]
+                if chunk == b'VP8 ': w, h = struct.unpack("<HH", head[26:30]); return w & 0x3fff, h & 0x3fff
+                if chunk == b'VP8L':
+                    b = head[21:25]
+                    return 1 + (((b[1] & 0x3f) << 8) | b[0]), 1 + (((b[3] & 0xf) << 10) | (b[2] << 2) | ((b[1] & 0xc0) >> 6))
+                if chunk == b'VP8X': return 1 + int.from_bytes(head[24:27], 'little'), 1 + int.from_bytes(head[27:30], 'little')
+            if kind == ".jpg":
+                f.seek(2)
+                while True:
+                    marker = f.read(2)
+                    if len(marker) < 2 or marker[0] != 0xff: break
+                    if marker[1] in (0xd8, 0x01) or 0xd0 <= marker[1] <= 0xd7: continue
+                    seg_len = struct.unpack(">H", f.read(2))[0]
+                    if 0xc0 <= marker[1] <= 0xcf and marker[1] not in (0xc4, 0xc8, 0xcc):
+                        h, w = struct.unpack(">xHH", f.read(5)); return w, h
+                    f.seek(seg_len - 2, 1)
+    except (OSError, struct.error): pass
+    return None, None
+
+def svg_stats(fp):
+    """ 输出文件大小与路径/元素数量 (.svgz 解压后统计) """
+    with open(fp, 'rb') as f: data = f.read()
+    size = len(data)
+    if data[:2] == b'\x1f\x8b': data = gzip.decompress(data)
+    elements = data.count(b"<") - data.count(b"</") - data.count(b"<?") - data.count(b"<!")
+    return {"bytes": size, "paths": data.count(b"<path"), "elements": elements}
+
+def postprocess_svg(fp, optimize, precision, svgz):
+    """ 优化 vtracer 写出的 SVG，并按需压缩为 gzip (.svgz)，写临时文件后替换 """
+    with open(fp, 'r', encoding='utf-8') as f: svg = f.read()
+    if optimize: svg = optimize_svg(svg, precision)
+    data = svg.encode('utf-8')
+    if svgz: data = gzip.compress(data, compresslevel=9, mtime=0)
+    tmp = fp + ".tmp"
+    with open(tmp, 'wb') as f: f.write(data)
+    os.replace(tmp, fp)
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB": return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+
+def file_hash(fp):
+    """ 文件内容哈希 (分块读取) """
+    h = hashlib.blake2b(digest_size=16)
+    with open(fp, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''): h.update(chunk)
+    return h.hexdigest()
+
+def pixel_hash(fp):
+    """ 解码后像素的哈希 (需要 Pillow)，可识别重新编码但像素相同的副本 """
+    with Image.open(fp) as img:
+        img = img.convert("RGBA")
+        h = hashlib.blake2b(f"{img.size}".encode(), digest_size=16)
+        h.update(img.tobytes())
+    return "px:" + h.hexdigest()
+
+def dedupe_key(fp, digest=None, pixels=False):
+    """ 去重键 (模块级，可提交到工作池)：返回 (键, 内容哈希)，键为内容哈希或 (pixels) 解码后像素哈希 """
+    digest = digest or file_hash(fp)
+    return (pixel_hash(fp) if pixels else digest), digest
+
+def convert_and_hash(fp, out_p, params, cfg):
+    """ convert_job 并在成功后附带源文件内容哈希 ("hash")，供清单记录，不在调度线程中读取文件 """
+    res = convert_job(fp, out_p, params, cfg)
+    if res["code"] == 0:
+        try: res["hash"] = file_hash(fp)
+        except OSError: pass
+    return res
+
+def temp_output(out_p):
+    """ 与 out_p 同目录的临时文件名 (同一文件系统内才能原子替换)，以 .svg 结尾供 vtracer 识别 """
+    d, name = os.path.split(out_p)
+    return os.path.join(d, f".{name}.{os.getpid()}-{threading.get_ident()}.tmp.svg")
+
+TEMP_OUTPUT = re.compile(r"^\.(.+)\.\d+-\d+\.tmp\.svg$") # temp_output 的文件名格式，分组为目标文件名
+
+def sweep_temp_outputs(out_dir, shard=None):
+    """ 清理中断的运行遗留的临时输出文件，返回清理数量。
+    指定 shard 时只清理属于该分片的文件，不影响共享输出目录中其他节点正在写入的文件 """
+    n = 0
+    for root, _, files in os.walk(out_dir):
+        for f in files:
+            m = TEMP_OUTPUT.match(f)
+            if not m or (shard and not in_shard(os.path.relpath(os.path.join(root, m.group(1)), out_dir), shard)): continue
+            discard(os.path.join(root, f)); n += 1
+    return n
+
+def discard(fp):
+    try: os.remove(fp)
+    except OSError: pass
+
+def commit_file(tmp, dst):
+    """ 把临时文件落盘 (fsync) 后原子替换为 dst，并同步目录项；之后才可安全删除原图 """
+    with open(tmp, 'rb+') as f: os.fsync(f.fileno())
+    os.replace(tmp, dst)
+    if os.name != 'nt': # Windows 不支持对目录 fsync
+        fd = os.open(os.path.dirname(dst) or ".", os.O_RDONLY)
+        try: os.fsync(fd)
+        finally: os.close(fd)
+
+def link_output(src, dst):
+    """ 把已有结果镜像到 dst：优先硬链接，跨设备等失败时复制；均经临时文件原子替换 """
+    if os.path.abspath(src) == os.path.abspath(dst): return
+    tmp = temp_output(dst)
+    discard(tmp)
+    try:
+        try: os.link(src, tmp)
+        except OSError: shutil.copy2(src, tmp)
+        commit_file(tmp, dst)
+    finally: discard(tmp)
+
+def params_hash(p, extra=None):
+    """ 实际生效参数集合 (及影响输出的其他选项) 的哈希，参数不变则输出不变 """
+    return hashlib.blake2b(json.dumps([active_params(p), extra or {}], sort_keys=True).encode(), digest_size=16).hexdigest()
+
+# === 增量转换清单 ===
+class Manifest:
+    """ 记录每个源文件的内容哈希与参数哈希，未变化的文件直接跳过 """
+    def __init__(self, out_dir, name=MANIFEST_NAME):
+        self.out_dir = out_dir
+        self.path = os.path.join(out_dir, name)
+        self.entries = {} # 相对路径 -> {"hash", "args", "out", "size", "mtime"}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: self.entries = json.load(f).get("files", {})
+        except: pass
+        # (内容哈希, 参数哈希) -> 相对路径，用于识别重命名/移动的文件
+        self.by_hash = {(e["hash"], e["args"]): rel for rel, e in self.entries.items()}
+
+    def check(self, rel, fp, out_p, args, digest=None):
+        """ 返回 ("skip", None) 无需转换 / ("copy", (旧输出, 内容哈希)) 复用已有结果 / ("convert", 内容哈希)。
+        需要比对内容而未提供 digest 时返回 ("hash", None)，由调用方在工作池中计算哈希后再次调用 """
+        e = self.entries.get(rel)
+        if not e and not self.by_hash: return "convert", None # 首次运行，转换成功后再计算哈希
+        st = os.stat(fp)
+        # 快速路径：大小、修改时间与参数均未变，无需读取文件内容
+        if e and e["args"] == args and e["size"] == st.st_size and e["mtime"] == st.st_mtime_ns and os.path.exists(out_p):
+            return "skip", None
+        if digest is None: return "hash", None
+        if e and e["args"] == args and e["hash"] == digest and os.path.exists(out_p):
+            self.record(rel, fp, out_p, digest, args)
+            return "skip", None
+        old = self.entries.get(self.by_hash.get((digest, args)))
+        if old:
+            old_out = os.path.join(self.out_dir, old["out"])
+            if os.path.exists(old_out): return "copy", (old_out, digest)
+        return "convert", digest
+
+    def restore(self, rel, e):
+        """ 从运行记录恢复条目 """
+        self.entries[rel] = e
+        self.by_hash[(e["hash"], e["args"])] = rel
+
+    def record(self, rel, fp, out_p, digest, args):
+        st = os.stat(fp)
+        digest = digest or file_hash(fp)
+        self.entries[rel] = {"hash": digest, "args": args, "out": os.path.relpath(out_p, self.out_dir), "size": st.st_size, "mtime": st.st_mtime_ns}
+        self.by_hash[(digest, args)] = rel
+
+    def save(self, in_dir):
+        # 丢弃源文件已不存在的记录，先写临时文件再替换，避免中断时损坏清单
+        files = {rel: e for rel, e in self.entries.items() if os.path.exists(os.path.join(in_dir, rel))}
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f: json.dump({"version": 1, "files": files}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+# === 运行记录 (断点续传) ===
+class Journal:
+    """ 只追加的运行记录：每个文件输出落盘后 (或失败后) 写一行，进程中断后可据此续传 """
+    def __init__(self, out_dir, name=JOURNAL_NAME):
+        self.path = os.path.join(out_dir, name)
+        self.f, self.synced = None, 0.0
+
+    def load(self, args):
+        """ 读取上次运行的记录 {相对路径: 记录}，只采用参数相同的记录 """
+        done, run_args = {}, None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try: rec = json.loads(line)
+                    except ValueError: continue # 中断时写了一半的行
+                    if "run" in rec: run_args = rec["args"]
+                    elif "file" in rec and run_args == args: done[rec["file"]] = rec
+        except OSError: pass
+        return done
+
+    def open(self, args, resume=False):
+        """ 续传时接着原记录追加，否则开始新的记录 """
+        self.f = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        self.write({"run": time.strftime("%Y-%m-%d %H:%M:%S"), "args": args, "resume": resume})
+
+    def write(self, rec):
+        self.f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self.f.flush()
+        if time.monotonic() - self.synced >= JOURNAL_SYNC: os.fsync(self.f.fileno()); self.synced = time.monotonic()
+
+    def close(self):
+        if not self.f: return
+        os.fsync(self.f.fileno()); self.f.close(); self.f = None
+
+# === 性能数据 ===
+METRIC_FIELDS = ["file", "preset", "status", "code", "time", "rss", "width", "height", "pixels", "bytes", "paths", "elements", "timeout", "oom", "fallback", "preprocessed", "tiles", "raw_bytes", "error"]
+
+def percentile(values, q):
+    """ 最近秩百分位数 (忽略 None) """
+    v = sorted(x for x in values if x is not None)
+    if not v: return None
+    return v[max(0, math.ceil(q / 100 * len(v)) - 1)]
+
+class Metrics:
+    """ 逐文件写出性能记录 (JSONL + CSV)，结束时汇总耗时分位数、最慢文件与每像素字节数 """
+    def __init__(self, out_dir, name=METRICS_NAME):
+        base = os.path.join(out_dir, name)
+        self.jsonl = open(base + ".jsonl", 'w', encoding='utf-8')
+        self.csv_f = open(base + ".csv", 'w', encoding='utf-8', newline='')
+        self.csv = csv.DictWriter(self.csv_f, fieldnames=METRIC_FIELDS, extrasaction='ignore')
+        self.csv.writeheader()
+        self.records = [] # 只保留汇总需要的字段
+
+    def add(self, rel, preset, res):
+        w, h = res.get("width"), res.get("height")
+        rec = {"file": rel, "preset": preset, "status": "ok" if res["code"] == 0 else "fail", "pixels": w * h if w and h else None, **res}
+        self.jsonl.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self.csv.writerow(rec)
+        self.records.append((rel, rec["preset"], rec.get("time"), rec["pixels"], rec.get("bytes") if rec["status"] == "ok" else None))
+
+    def close(self):
+        self.jsonl.close(); self.csv_f.close()
+
+    def summary(self, slowest=5):
+        """ 返回汇总字典与日志文本行 """
+        timed = [r for r in self.records if r[2] is not None] # 任务异常时没有耗时
+        times = [r[2] for r in timed]
+        per_preset = {}
+        for _, preset, _, pixels, size in self.records:
+            if pixels and size:
+                acc = per_preset.setdefault(preset, [0, 0]); acc[0] += size; acc[1] += pixels
+        summ = {"count": len(times), "p50": percentile(times, 50), "p95": percentile(times, 95), "p99": percentile(times, 99),
+                "slowest": [(r[0], r[2]) for r in sorted(timed, key=lambda r: -r[2])[:slowest]],
+                "bytes_per_pixel": {k: round(b / px, 4) for k, (b, px) in per_preset.items()}}
+        if not times: return summ, []
+        lines = [f"耗时 p50 {summ['p50']:.2f}s / p95 {summ['p95']:.2f}s / p99 {summ['p99']:.2f}s"]
+        lines += [f"  最慢: {rel} {t:.2f}s" for rel, t in summ["slowest"]]
+        lines += [f"  {k}: {v} 字节/像素" for k, v in summ["bytes_per_pixel"].items()]
+        return summ, lines
+
+# === 参数与选项 ===
+DEFAULT_PARAMS = dict(PRESETS["默认 (Default)"])
+DEFAULT_OPTIONS = {
+    "recursive": False, # 处理子文件夹
+    "delete": False,    # 成功后删除原文件
+    "workers": CPU_COUNT,
+    "engine": "cli",    # cli / python
+    "force": False,     # 忽略增量清单，全部重新转换
+    "exe": None,        # vtracer 可执行文件路径，默认 resource_path(EXECUTABLE_NAME)
+    "include": [],      # 只处理匹配这些 glob 的相对路径 (空=全部)
+    "exclude": [],      # 跳过匹配这些 glob 的文件或文件夹
+    "metrics": False,   # 在输出目录写出逐文件性能数据
+    "timeout": 0,       # 单个任务超时秒数 (0=不限，仅命令行引擎)
+    "mem_limit": 0,     # 单个任务内存上限 MB (0=不限，仅命令行引擎 + POSIX)
+    "retries": 2,       # 超时/超内存后使用降级参数重试的次数
+    # 预处理 (需要 Pillow)：输出 SVG 仍保持原图尺寸
+    "max_pixels": 0,    # 像素数上限，超过则缩小 (0=不限)
+    "max_edge": 0,      # 长边上限像素 (0=不限)
+    "denoise": 0,       # 中值滤波窗口大小 (0=关闭，偶数向上取奇数)
+    "colors": 0,        # 预量化到 N 种颜色 (0=关闭)
+    # 分块 (需要 Pillow)：像素数超过阈值的图片切块并行转换后拼接
+    "tile_pixels": 64_000_000, # 自动分块的像素阈值 (0=关闭)
+    "tile_size": 2048,  # 分块边长
+    "tile_overlap": 16, # 分块之间的重叠像素
+    # 后处理：优化路径并可输出 gzip 压缩的 .svgz
+    "optimize": False,  # 坐标取整、相对命令、合并同色路径、丢弃不可见/退化形状
+    "opt_precision": 2, # 优化后保留的小数位数
+    "svgz": False,      # 输出 .svgz
+    "dedupe": "",       # 相同图片只转换一次: "" 关闭 / "content" 按文件内容 / "pixels" 按解码后像素 (需要 Pillow)
+    "auto": False,      # 自动预设：逐个文件分析后选择预设 (需要 Pillow 与 NumPy)
+    "overrides": {},    # 自动预设时覆盖所选预设的参数
+    "resume": False,    # 断点续传：跳过上次运行记录中已完成或已失败的文件
+    "shard": None,      # 多机分片 (序号, 总数)，序号从 1 开始；只处理属于该分片的文件
+}
+DISCOVERY_QUEUE = 1024 # 遍历与转换之间的有界队列长度
+LOOKAHEAD = 256        # 从已发现文件中挑选最大文件优先调度的窗口
+
+def find_preset(name):
+    """ 按完整名称或括号内英文名 (不区分大小写) 查找预设，如 "黑白 (BW)" 或 "bw"；也可为自动预设 """
+    if name in PRESETS or name == AUTO_PRESET: return name
+    for k in list(PRESETS) + [AUTO_PRESET]:
+        if k.split("(")[-1].rstrip(")").strip().lower() == name.strip().lower(): return k
+    return None
+
+def make_params(preset=None, overrides=None):
+    """ 以预设为基础叠加覆盖项，得到 PRESETS 格式的参数字典 """
+    p = dict(DEFAULT_PARAMS)
+    if preset:
+        key = find_preset(preset)
+        if key is None: raise ValueError(f"未知预设: {preset}")
+        if key != AUTO_PRESET: p.update(PRESETS[key]) # 自动预设在转换时逐个文件决定，这里保留默认参数
+    for k, v in (overrides or {}).items():
+        if k not in PARAM_KEYS: raise ValueError(f"未知参数: {k}")
+        p[k] = v
+    return normalize_params(p)
+
+OUTPUT_OPTIONS = ("max_pixels", "max_edge", "denoise", "colors", "tile_pixels", "tile_size", "tile_overlap", "optimize", "opt_precision", "svgz", "auto", "overrides") # 会改变输出结果、需计入增量清单参数哈希的选项
+
+def job_config(opts, engine, exe):
+    """ 提交给 convert_job 的单任务配置 (普通字典，可跨进程传递) """
+    return {"engine": engine, "exe": exe, "timeout": opts["timeout"] or None, "mem_limit": int(opts["mem_limit"]) * 1024 * 1024 or None,
+            "retries": int(opts["retries"]), "max_pixels": int(opts["max_pixels"]), "max_edge": int(opts["max_edge"]),
+            "denoise": int(opts["denoise"]), "colors": int(opts["colors"]), "tile_pixels": int(opts["tile_pixels"]),
+            "tile_size": max(64, int(opts["tile_size"])), "tile_overlap": max(0, int(opts["tile_overlap"])), "run_slots": max(1, int(opts["workers"])) if engine == "cli" else 1,
+            "optimize": bool(opts["optimize"]), "opt_precision": int(opts["opt_precision"]) if opts["optimize"] else 0, "svgz": bool(opts["svgz"]),
+            "auto": bool(opts["auto"]), "overrides": dict(opts["overrides"]) if opts["auto"] else {}}
+
+def preset_name(p):
+    """ 参数与某个预设的生效部分一致时返回预设名，否则为 "自定义" """
+    act = active_params(p)
+    for name, preset in PRESETS.items():
+        if active_params(preset) == act: return name
+    return "自定义"
+
+def normalize_params(p):
+    """ 修正 vtracer 不接受的参数组合 (色彩精度为8时渐变步长至少为1) """
+    p = dict(p)
+    if p["colormode"] == "color" and p["color_precision"] >= 8 and p["gradient_step"] == 0: p["gradient_step"] = 1
+    return p
+
+# === 多机分片 ===
+def parse_shard(text):
+    """ 解析 "i/N" (1 <= i <= N)，返回 (i, N) """
+    try: i, n = (int(x) for x in text.split("/"))
+    except ValueError: raise ValueError(f"分片格式应为 序号/总数，如 1/4: {text}")
+    if not 1 <= i <= n: raise ValueError(f"分片序号应在 1 到 {n} 之间: {text}")
+    return i, n
+
+def in_shard(rel, shard):
+    """ 按相对路径 (去掉扩展名、统一为 / 分隔) 的哈希分配分片，各节点结果一致。
+    去掉扩展名后即为输出文件的相对路径，同名输出 (如 a.png 与 a.jpg) 总在同一分片，共享输出目录时不会冲突 """
+    key = os.path.splitext(rel)[0].replace(os.sep, "/")
+    h = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+    return h % shard[1] == shard[0] - 1
+
+def shard_file(name, shard):
+    """ 分片各自使用的状态文件名，如 .pictosvg_manifest.shard2of4.json """
+    if not shard: return name
+    base, ext = os.path.splitext(name)
+    return f"{base}.shard{shard[0]}of{shard[1]}{ext}"
+
+def write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f: json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def merge_shard_summaries(out_dir):
+    """ 合并输出目录中各分片的汇总为一份报告 (写入 SUMMARY_NAME 并返回)。
+    检查分片总数与参数是否一致，列出缺失的分片 """
+    base, ext = os.path.splitext(SUMMARY_NAME)
+    parts = []
+    for f in sorted(os.listdir(out_dir)):
+        if re.fullmatch(re.escape(base) + r"\.shard\d+of\d+" + re.escape(ext), f):
+            with open(os.path.join(out_dir, f), 'r', encoding='utf-8') as fh: parts.append(json.load(fh))
+    if not parts: raise ValueError(f"{out_dir} 中没有分片汇总")
+    total = {p["shard"][1] for p in parts}
+    if len(total) > 1: raise ValueError(f"分片总数不一致: {sorted(total)}")
+    n = total.pop()
+    got = {p["shard"][0] for p in parts}
+    report = {"shards": n, "merged": time.strftime("%Y-%m-%d %H:%M:%S"), "missing": [i for i in range(1, n + 1) if i not in got],
+              "args_mismatch": len({p["args"] for p in parts}) > 1,
+              "stats": {}, "nodes": [{k: p[k] for k in ("shard", "host", "started", "finished")} for p in parts], "failures": []}
+    for p in parts:
+        for k, v in p["stats"].items():
+            if isinstance(v, (int, float)): report["stats"][k] = report["stats"].get(k, 0) + v
+        report["failures"] += p["failures"]
+    report["failures"].sort(key=lambda f: f["file"])
+    write_json(os.path.join(out_dir, SUMMARY_NAME), report)
+    return report
+
+# === 文件发现 ===
+def _match(rel, patterns):
+    rel = rel.replace(os.sep, "/")
+    return any(fnmatch.fnmatch(rel, pat) or fnmatch.fnmatch(os.path.basename(rel), pat) for pat in patterns)
+
+def iter_images(in_dir, recursive=False, include=(), exclude=(), skip_dirs=()):
+    """ 基于 scandir 的流式遍历，逐个产出 (路径, 文件大小)。
+    过滤扩展名与 include/exclude 模式，记录已访问目录防止符号链接成环 """
+    visited, skip = set(), {os.path.realpath(d) for d in skip_dirs}
+    stack = [in_dir]
+    while stack:
+        d = stack.pop()
+        try:
+            st = os.stat(d)
+            if (st.st_dev, st.st_ino) in visited: continue
+            visited.add((st.st_dev, st.st_ino))
+            entries = list(os.scandir(d))
+        except OSError: continue
+        subdirs = []
+        for e in entries:
+            rel = os.path.relpath(e.path, in_dir)
+            try:
+                if e.is_dir():
+                    if recursive and not _match(rel, exclude) and os.path.realpath(e.path) not in skip: subdirs.append(e.path)
+                    continue
+                if Path(e.name).suffix.lower() not in IMAGE_EXTS or not e.is_file(): continue
+                if (include and not _match(rel, include)) or _match(rel, exclude): continue
+                yield e.path, e.stat().st_size
+            except OSError: continue
+        stack.extend(reversed(subdirs))
+
+def match_image(rel, recursive=False, include=(), exclude=()):
+    """ 单个相对路径是否应被转换，规则与 iter_images 一致 (供监视模式使用) """
+    parts = Path(rel).parts
+    if Path(rel).suffix.lower() not in IMAGE_EXTS or not parts or parts[0] == os.pardir: return False
+    if len(parts) > 1 and not recursive: return False
+    if any(_match(os.path.join(*parts[:i]), exclude) for i in range(1, len(parts))): return False
+    return not (include and not _match(rel, include)) and not _match(rel, exclude)
+
+def _discover(in_dir, opts, out_dir, q, stop):
+    """ 遍历线程：把发现的文件放入有界队列，结束时放入 None """
+    try:
+        for item in iter_images(in_dir, opts["recursive"], opts["include"], opts["exclude"], [out_dir]):
+            while not stop.is_set():
+                try: q.put(item, timeout=0.2); break
+                except queue.Full: pass
+            if stop.is_set(): return
+    finally: q.put(None)
+
+# === 批量转换流水线 ===
+def run_batch(in_dir, out_dir, params, options=None, log=print, progress=None, source=None, stop=None, sink=None):
+    """ 批量转换 in_dir 下的图片到 out_dir。
+    params: PRESETS 格式的参数字典；options: 见 DEFAULT_OPTIONS；
+    log(msg) 输出日志；progress(done, found) 报告进度 (found 随遍历增长)。
+    source(in_dir, opts, out_dir, q, stop) 为文件来源线程 (默认遍历一次文件夹，监视模式持续产出)，
+    stop 事件被设置后来源结束，已提交的任务完成后返回。
+    sink(rel, out_p) 在每个文件处理结束后调用 (失败时 out_p 为 None)，接管输出 (如写入归档)；
+    此时源文件与输出都只是临时文件，不使用增量清单。返回统计字典 """
+    opts = {**DEFAULT_OPTIONS, **(options or {})}
+    stats = {"found": 0, "total": 0, "success": 0, "failed": 0, "skipped": 0, "reused": 0, "deduped": 0, "resumed": 0, "raw_bytes": 0, "out_bytes": 0}
+    workers = max(1, int(opts["workers"]))
+    engine = resolve_engine(opts["engine"])
+    if engine != opts["engine"]: log("未安装 vtracer Python 模块，使用命令行引擎")
+    exe = opts["exe"] or resource_path(EXECUTABLE_NAME)
+    if not os.path.exists(out_dir): 
+        try: os.makedirs(out_dir) 
+        except: pass
+
+    params, subdirs, delete = normalize_params(params), opts["recursive"], opts["delete"]
+    shard = tuple(opts["shard"]) if opts["shard"] else None
+    manifest, force = Manifest(out_dir, shard_file(MANIFEST_NAME, shard)), opts["force"]
+    cfg = job_config(opts, engine, exe)
+    if cfg["auto"] and (Image is None or np is None): log("未安装 Pillow/NumPy，自动预设使用当前参数"); cfg["auto"] = False
+    preset = AUTO_PRESET if cfg["auto"] else preset_name(params)
+    args = params_hash(params, {k: cfg[k] for k in OUTPUT_OPTIONS if cfg[k]})
+    if (cfg["timeout"] or cfg["mem_limit"]) and engine == "python": log("注意: 超时与内存上限仅对命令行引擎生效")
+    if Image is None and (cfg["max_pixels"] or cfg["max_edge"] or cfg["denoise"] or cfg["colors"]): log("未安装 Pillow，跳过预处理")
+    metrics = Metrics(out_dir, shard_file(METRICS_NAME, shard)) if opts["metrics"] else None
+    journal = Journal(out_dir, shard_file(JOURNAL_NAME, shard))
+    resumed = journal.load(args) if opts["resume"] else {}
+    if opts["resume"]: log(f"续传: 上次运行记录中已处理 {len(resumed)} 个文件，清理临时文件 {sweep_temp_outputs(out_dir, shard)} 个")
+    started, failures = time.strftime("%Y-%m-%d %H:%M:%S"), [] # failures: 分片汇总中的失败列表
+    journal.open(args, resume=bool(opts["resume"]))
+    dedupe = opts["dedupe"]
+    if dedupe == "pixels" and Image is None: log("未安装 Pillow，按文件内容去重"); dedupe = "content"
+    groups, leaders, pixel_keys = {}, {}, {} # 去重: 键 -> {"job", "ok", "followers"}；代表任务 -> 键；内容哈希 -> 像素哈希
+    claimed = {} # sink 模式: 输出路径 -> 占用它的源文件
+
+    def remove_source(fp):
+        if delete: 
+            try: os.remove(fp)
+            except: pass
+
+    def plan(fp, digest=None):
+        """ 增量：对照清单跳过内容与参数均未变化的文件，重命名/移动的文件直接复用旧结果。
+        需要转换时返回任务，需要先计算内容哈希时返回 "hash" """
+        rel = os.path.relpath(fp, in_dir)
+        out = os.path.join(out_dir, os.path.dirname(rel)) if subdirs else out_dir
+        os.makedirs(out, exist_ok=True)
+        out_p = os.path.join(out, Path(fp).stem + (".svgz" if cfg["svgz"] else ".svg"))
+        r = resumed.pop(rel, None)
+        st = os.stat(fp) if r else None
+        if r and (r["size"], r["mtime"]) == (st.st_size, st.st_mtime_ns):
+            # 续传：源文件未变化，上次已失败的不再重试，已完成的恢复清单条目
+            if r["status"] == "fail":
+                stats["resumed"] += 1
+                if shard: failures.append({"file": rel.replace(os.sep, "/"), "error": r["error"]})
+                return None
+            if os.path.exists(out_p):
+                manifest.restore(rel, {k: r[k] for k in ("hash", "args", "out", "size", "mtime")})
+                stats["resumed"] += 1; remove_source(fp); return None
+        try: action, info = ("convert", None) if force or sink else manifest.check(rel, fp, out_p, args, digest)
+        except OSError: action, info = "convert", None
+        if action == "hash": return "hash"
+        if action == "copy":
+            try:
+                if os.path.abspath(info[0]) != os.path.abspath(out_p): link_output(info[0], out_p)
+                manifest.record(rel, fp, out_p, info[1], args)
+                stats["reused"] += 1; remove_source(fp); return None
+            except OSError: action, info = "convert", None
+        if action == "skip": stats["skipped"] += 1; remove_source(fp); return None
+        return fp, rel, out_p, info
+
+    def schedule(fp, hashed=None):
+        """ 规划并提交单个文件。清单比对需要的内容哈希在工作池中计算 (hashed 为其结果)，不阻塞调度 """
+        try: job = plan(fp, hashed.result() if hashed else None)
+        except OSError as e:
+            job = None; stats["total"] += 1; stats["failed"] += 1; log(f"❌ {fp} ({e})")
+            if shard: failures.append({"file": os.path.relpath(fp, in_dir).replace(os.sep, "/"), "error": str(e)})
+            if sink: sink(os.path.relpath(fp, in_dir), None)
+        if job == "hash": hashing[pool.submit(file_hash, fp)] = fp; return
+        if job is None: tick(); return
+        stats["total"] += 1
+        if sink:
+            # 输出交给 sink 时同名输出 (如 a.png 与 a.jpg) 不能互相覆盖，只转换先调度的一个
+            other = claimed.setdefault(job[2], job[1])
+            if other != job[1]: fail(job, f"输出与 {other} 同名"); return
+        if dedupe:
+            # 去重键需读取整个文件 (pixels 模式还要解码)，在工作池中计算，不阻塞调度；同一内容只解码一次
+            key = pixel_keys.get(job[3]) if dedupe == "pixels" else job[3]
+            if key: group(job, key, job[3])
+            else: hashing[pool.submit(dedupe_key, job[0], job[3], dedupe == "pixels")] = job
+            return
+        # 内容哈希未知时由工作线程在转换后一并计算，供清单记录
+        inflight[pool.submit(convert_job if job[3] or sink else convert_and_hash, job[0], job[2], params, cfg)] = job
+
+    def group(job, key, digest):
+        """ 去重：同组只转换代表文件，其余在代表完成后镜像其结果 """
+        job = job[:3] + (digest,)
+        g = groups.get(key)
+        if g is None:
+            groups[key] = {"job": job, "ok": None, "followers": []}; leaders[job] = key
+            inflight[pool.submit(convert_job, job[0], job[2], params, cfg)] = job
+        elif g["ok"] is None: g["followers"].append(job)
+        else: finish_duplicate(job, g)
+
+    def tick():
+        nonlocal done
+        done += 1
+        if progress: progress(done, stats["found"])
+        return f"[{done}/{stats['found']}{'+' if walking else ''}]"
+
+    def succeed(job, note=""):
+        fp, rel, out_p, digest = job
+        log(f"{tick()} ✅ {rel}" + (f" ({note})" if note else ""))
+        stats["success"] += 1
+        try:
+            if not sink: manifest.record(rel, fp, out_p, digest, args)
+            journal.write({"file": rel, "status": "ok", **manifest.entries.get(rel, {})})
+        except OSError: return
+        remove_source(fp) # 输出已落盘并记入运行记录后才删除原图
+        if sink: sink(rel, out_p)
+
+    def fail(job, why):
+        stats["failed"] += 1
+        if shard: failures.append({"file": job[1].replace(os.sep, "/"), "error": why})
+        log(f"{tick()} ❌ {job[1]}" + (f" ({why})" if why else ""))
+        try:
+            st = os.stat(job[0])
+            journal.write({"file": job[1], "status": "fail", "size": st.st_size, "mtime": st.st_mtime_ns, "error": why})
+        except OSError: pass
+        if sink: sink(job[1], None)
+
+    def finish_duplicate(job, g):
+        """ 重复文件：代表文件转换成功则镜像其输出，否则同样记为失败 """
+        if not g["ok"]: fail(job, f"与 {g['job'][1]} 相同，其转换失败"); return
+        try: link_output(g["job"][2], job[2])
+        except OSError as e: fail(job, str(e)); return
+        stats["deduped"] += 1
+        succeed(job, f"与 {g['job'][1]} 相同")
+
+    # 遍历在独立线程中进行，发现第一个文件即开始转换；文件列表不会整体驻留内存
+    q, stop = queue.Queue(maxsize=DISCOVERY_QUEUE), stop or threading.Event()
+    threading.Thread(target=source or _discover, args=(in_dir, opts, out_dir, q, stop), daemon=True).start()
+    log(f"开始处理 (并发 {workers}{f'，分片 {shard[0]}/{shard[1]}' if shard else ''})...")
+    # CLI 引擎的工作都在子进程中，线程池即可；Python 引擎需多进程才能并行
+    pool_cls = ProcessPoolExecutor if engine == "python" else ThreadPoolExecutor
+    pending, inflight, hashing, walking, done, seq, saved = [], {}, {}, True, 0, 0, 0 # hashing: 计算去重键或清单内容哈希的任务
+    try:
+        with pool_cls(max_workers=workers) as pool:
+            while walking or pending or inflight or hashing:
+                busy = bool(inflight or hashing)
+                if source and not sink and done != saved and not pending and not busy:
+                    # 持续运行的来源在空闲时保存清单，中途退出也不会丢失进度
+                    try: manifest.save(in_dir)
+                    except OSError as e: log(f"保存转换清单失败: {e}")
+                    saved = done
+                # 1. 从队列取出新发现的文件放入窗口，窗口内按文件大小从大到小调度
+                while walking and len(pending) < LOOKAHEAD:
+                    try: item = q.get(block=not pending and not busy)
+                    except queue.Empty: break
+                    if item is None: walking = False; break
+                    if shard and not in_shard(os.path.relpath(item[0], in_dir), shard): continue
+                    stats["found"] += 1; seq += 1
+                    heapq.heappush(pending, (-item[1], seq, item[0]))
+                # 2. 保持有限个在途任务
+                while pending and len(inflight) + len(hashing) < workers * 2:
+                    schedule(heapq.heappop(pending)[2])
+                if not inflight and not hashing: continue
+                # 3. 结果按完成顺序返回，计数与删除原文件均在此单线程中处理
+                finished, _ = wait(list(inflight) + list(hashing), timeout=0.05 if walking else None, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    if fut in hashing:
+                        job = hashing.pop(fut)
+                        if isinstance(job, str): schedule(job, fut); continue # 清单比对所需的内容哈希
+                        try: key, digest = fut.result()
+                        except Exception as e: fail(job, f"读取失败: {e}"); continue
+                        if dedupe == "pixels": pixel_keys[digest] = key
+                        group(job, key, digest); continue
+                    job = inflight.pop(fut)
+                    try: res = fut.result()
+                    except Exception as e: res = {"code": -1, "rss": None, "error": str(e), "time": None, "width": None, "height": None}
+                    if res.get("hash"): job = job[:3] + (res.pop("hash"),)
+                    if metrics: metrics.add(job[1], preset, res)
+                    if res["code"] == 0:
+                        notes = [f"自动: {res['preset']}"] if res.get("preset") else []
+                        if res.get("fallback"): notes.append(res["fallback"])
+                        if res.get("raw_bytes"):
+                            stats["raw_bytes"] += res["raw_bytes"]; stats["out_bytes"] += res["bytes"]
+                            notes.append(f"{format_bytes(res['raw_bytes'])} → {format_bytes(res['bytes'])}, -{100 - res['bytes'] * 100 // max(1, res['raw_bytes'])}%")
+                        succeed(job, "; ".join(notes))
+                    else: fail(job, "超时" if res.get("timeout") else "超出内存" if res.get("oom") else res["error"])
+                    if job in leaders:
+                        g = groups[leaders.pop(job)]
+                        g["ok"] = res["code"] == 0
+                        for dup in g["followers"]: finish_duplicate(dup, g)
+                        g["followers"].clear()
+        journal.write({"end": time.strftime("%Y-%m-%d %H:%M:%S"), "success": stats["success"], "failed": stats["failed"]})
+    finally:
+        stop.set()
+        journal.close()
+        if metrics: metrics.close()
+
+    if shard:
+        # 分片汇总：各节点写入共享输出目录，全部完成后用 merge_shard_summaries 合并
+        path = os.path.join(out_dir, shard_file(SUMMARY_NAME, shard))
+        try:
+            write_json(path, {"shard": list(shard), "host": platform.node(), "args": args, "started": started,
+                              "finished": time.strftime("%Y-%m-%d %H:%M:%S"), "stats": {k: v for k, v in stats.items() if k != "metrics"}, "failures": failures})
+            log(f"分片汇总已写入 {path}")
+        except OSError as e: log(f"写入分片汇总失败: {e}")
+    if stats["found"] == 0: log("未找到图片"); return stats
+    if stats["skipped"] or stats["reused"]: log(f"跳过未变化文件 {stats['skipped']} 个，复用已有结果 {stats['reused']} 个")
+    if stats["deduped"]: log(f"去重节省 {stats['deduped']} 次转换")
+    if stats["resumed"]: log(f"续传跳过上次已处理的文件 {stats['resumed']} 个")
+    if not sink:
+        try: manifest.save(in_dir)
+        except OSError as e: log(f"保存转换清单失败: {e}")
+    log(f"完成! 成功: {stats['success']}/{stats['total']}")
+    if stats["raw_bytes"]:
+        log(f"后处理体积: {format_bytes(stats['raw_bytes'])} → {format_bytes(stats['out_bytes'])} (-{100 - stats['out_bytes'] * 100 // stats['raw_bytes']}%)")
+    if metrics:
+        stats["metrics"], lines = metrics.summary()
+        for line in lines: log(line)
+    return stats
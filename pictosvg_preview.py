@@ -0,0 +1,156 @@
+""" PicToSvg 参数预览：在缩小的样张上后台试转换，可随时取消，结果按参数缓存 (不依赖 tkinter，需要 Pillow) """
+import os
+import io
+import math
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pictosvg_core import (Image, EXECUTABLE_NAME, active_params, normalize_params, build_cmd, build_py_kwargs,
+                           resolve_engine, resource_path, convert_py, svg_stats, discard)
+from pictosvg_svg import PATH_EL, PATH_ATTR, TRANSLATE, parse_path
+try: from PIL import ImageDraw, ImageChops
+except ImportError: ImageDraw = ImageChops = None
+
+# === 预览配置 ===
+PREVIEW_EDGE = 320  # 样张缩小后的长边像素
+PREVIEW_CACHE = 64  # 缓存的参数组合数
+CURVE_STEPS = 8     # 每段贝塞尔曲线采样的折线段数
+
+def flatten(cmds, steps=CURVE_STEPS):
+    """ 把 parse_path 的命令列表展平为折线子路径 [[(x, y), ...]]，贝塞尔曲线按 steps 段采样 """
+    subs, cur, x, y = [], None, 0.0, 0.0
+    for c, a in cmds:
+        if c == "Z": continue # 多边形本身闭合
+        if c == "M" or cur is None:
+            cur = [(x, y)] if c != "M" else []
+            subs.append(cur)
+        if c in ("M", "L"): cur.append((a[0], a[1]))
+        elif c == "C":
+            for i in range(1, steps + 1):
+                t = i / steps; u = 1 - t
+                cur.append((u**3 * x + 3 * u*u*t * a[0] + 3 * u*t*t * a[2] + t**3 * a[4],
+                            u**3 * y + 3 * u*u*t * a[1] + 3 * u*t*t * a[3] + t**3 * a[5]))
+        elif c == "Q":
+            for i in range(1, steps + 1):
+                t = i / steps; u = 1 - t
+                cur.append((u*u * x + 2 * u*t * a[0] + t*t * a[2], u*u * y + 2 * u*t * a[1] + t*t * a[3]))
+        x, y = a[-2], a[-1]
+    return [s for s in subs if len(s) >= 3]
+
+def render_svg(svg, width, height):
+    """ 把 vtracer 输出栅格化为 RGB 图片 (白底)。只处理 <path>；含多个子路径时按奇偶规则处理孔洞 """
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    for m in PATH_EL.finditer(svg):
+        attrs = dict(PATH_ATTR.findall(m.group(1)))
+        fill = attrs.get("fill", "#000000")
+        tm = TRANSLATE.match(attrs.get("transform", "translate(0,0)"))
+        if fill == "none" or not tm: continue
+        cmds = parse_path(attrs.get("d", ""), float(tm.group(1)), float(tm.group(2) or 0))
+        subs = flatten(cmds) if cmds else []
+        if not subs: continue
+        try:
+            if len(subs) == 1: draw.polygon(subs[0], fill=fill); continue
+            # 在包围盒大小的遮罩上逐个子路径异或，再按遮罩填色
+            x0 = max(0, int(min(p[0] for s in subs for p in s))); y0 = max(0, int(min(p[1] for s in subs for p in s)))
+            x1 = min(width, int(max(p[0] for s in subs for p in s)) + 1); y1 = min(height, int(max(p[1] for s in subs for p in s)) + 1)
+            if x1 <= x0 or y1 <= y0: continue
+            mask = Image.new("1", (x1 - x0, y1 - y0))
+            for s in subs:
+                part = Image.new("1", mask.size)
+                ImageDraw.Draw(part).polygon([(px - x0, py - y0) for px, py in s], fill=1)
+                mask = ImageChops.logical_xor(mask, part)
+            img.paste(fill, (x0, y0, x1, y1), mask)
+        except ValueError: continue # 无法识别的颜色
+    return img
+
+class Previewer:
+    """ 后台试转换缩小后的样张。request 会取消进行中的转换；结果在工作线程中通过回调返回，
+    包含预览图 (PNG)、元素数量与按像素比例估算的原尺寸耗时和体积 """
+    def __init__(self, engine="cli", exe=None):
+        self.engine, self.exe = resolve_engine(engine), exe or resource_path(EXECUTABLE_NAME)
+        self.sample, self.full, self.size = None, None, None
+        self.cache, self.lock = OrderedDict(), threading.Lock()
+        self.gen, self.proc = 0, None
+        self.tmpdir = tempfile.mkdtemp(prefix="pictosvg_preview_")
+
+    def set_sample(self, fp, box=(PREVIEW_EDGE, PREVIEW_EDGE)):
+        """ 准备样张：缩小到 box 以内后保存为 PNG，清空缓存。返回 (原尺寸, 预览尺寸) """
+        self.cancel()
+        with Image.open(fp) as img:
+            full = img.size
+            img.draft("RGB", box)
+            img.thumbnail(box, Image.LANCZOS)
+            if img.mode not in ("RGB", "RGBA"): img = img.convert("RGBA")
+            path = os.path.join(self.tmpdir, f"sample{self.gen}.png")
+            img.save(path, "PNG", compress_level=1)
+        with self.lock:
+            if self.sample: discard(self.sample)
+            self.sample, self.full, self.size = path, full, img.size
+            self.cache.clear()
+        return full, img.size
+
+    def request(self, params, callback):
+        """ 预览一组参数：命中缓存时立即回调，否则取消进行中的转换并在后台重新转换 """
+        params = normalize_params(params)
+        key = tuple(sorted(active_params(params).items()))
+        with self.lock:
+            self.gen += 1
+            gen, hit = self.gen, self.cache.get(key)
+            if hit: self.cache.move_to_end(key)
+        self._kill()
+        if hit: return callback(hit)
+        if self.sample: threading.Thread(target=self._run, args=(gen, key, params, callback), daemon=True).start()
+
+    def cancel(self):
+        with self.lock: self.gen += 1
+        self._kill()
+
+    def close(self):
+        self.cancel()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _kill(self):
+        with self.lock: p, self.proc = self.proc, None
+        if p and p.poll() is None: p.kill()
+
+    def _trace(self, gen, sample, out, params):
+        if self.engine == "python": return convert_py(sample, out, build_py_kwargs(params))
+        startup = None
+        if os.name == 'nt': startup = subprocess.STARTUPINFO(); startup.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        p = subprocess.Popen(build_cmd(self.exe, sample, out, params), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, startupinfo=startup)
+        with self.lock:
+            if gen == self.gen: self.proc = p
+            else: p.kill() # 启动期间已被新的请求取代
+        code = p.wait()
+        with self.lock:
+            if self.proc is p: self.proc = None
+        if code != 0 and gen == self.gen: raise RuntimeError(f"vtracer 退出码 {code}")
+
+    def _run(self, gen, key, params, callback):
+        with self.lock: sample, full, size = self.sample, self.full, self.size
+        out = os.path.join(self.tmpdir, f"preview{gen}.svg")
+        try:
+            t0 = time.perf_counter()
+            self._trace(gen, sample, out, params)
+            elapsed = time.perf_counter() - t0
+            if gen != self.gen: return
+            with open(out, 'r', encoding='utf-8') as f: svg = f.read()
+            buf = io.BytesIO()
+            render_svg(svg, *size).save(buf, "PNG")
+            ratio = max(1.0, (full[0] * full[1]) / (size[0] * size[1]))
+            stats = svg_stats(out)
+            # 耗时按像素数、体积按边长 (路径长度) 线性放大，仅为粗略估计
+            res = {**stats, "image": buf.getvalue(), "time": elapsed, "size": size,
+                   "est_time": elapsed * ratio, "est_bytes": stats["bytes"] * math.sqrt(ratio)}
+        except Exception as e: res = {"error": str(e)}
+        finally: discard(out)
+        with self.lock:
+            if gen != self.gen: return # 已被新的请求取代
+            if "error" not in res:
+                self.cache[key] = res
+                while len(self.cache) > PREVIEW_CACHE: self.cache.popitem(last=False)
+        callback(res)
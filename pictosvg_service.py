@@ -0,0 +1,281 @@
+""" PicToSvg 本地 HTTP 转换服务：任务队列 + 固定大小的工作池，参数处理与批量工具一致
+
+用法: python -m pictosvg_service [--port 8765] [-j 4] [--queue 64]
+
+POST /convert?preset=bw&p_filter_speckle=8     请求体为图片内容 (按文件头识别格式，无法识别时返回 400)
+POST /convert?path=/abs/img.png&preset=auto    转换服务器本地文件
+    wait=秒数: 在此时间内完成则直接返回 SVG，否则返回 202 与任务 ID (wait=0 立即返回)
+GET  /jobs/<id>        任务状态 (JSON)
+GET  /jobs/<id>/svg    转换结果
+GET  /metrics          队列深度、吞吐量与耗时直方图 (Prometheus 文本格式)
+"""
+import argparse
+import bisect
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from pictosvg_core import (AUTO_PRESET, DEFAULT_PARAMS, DEFAULT_OPTIONS, ENGINES, EXECUTABLE_NAME, CPU_COUNT, IMAGE_EXTS,
+                           resource_path, resolve_engine, find_preset, sniff_image, image_size, make_params, preset_name, job_config, convert_job)
+
+# === 服务配置 ===
+DEFAULT_PORT = 8765
+QUEUE_SIZE = 64             # 等待中的任务上限，超出返回 429
+JOB_HISTORY = 1000          # 保留的已完成任务数，更早的任务连同结果文件一起清理
+MAX_UPLOAD = 256 * 1024 * 1024
+PIXEL_LIMIT = 178_956_970   # 单张图片像素上限 (Pillow 默认的解压炸弹上限；核心为本地批量处理关闭了 Pillow 自身的检查)
+REQUEST_TIMEOUT = 30        # 读取请求的套接字超时，以及 wait 的默认与最大值 (秒)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+THROUGHPUT_WINDOW = 60      # 吞吐量统计窗口 (秒)
+
+class Histogram:
+    """ 固定分桶的累计直方图 (线程安全)，按 Prometheus 格式输出 """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets, self.counts = buckets, [0] * (len(buckets) + 1)
+        self.sum, self.lock = 0.0, threading.Lock()
+
+    def observe(self, v):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, v)] += 1; self.sum += v
+
+    def render(self, name, help_text):
+        with self.lock: counts, total = list(self.counts), self.sum
+        lines, acc = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"], 0
+        for b, c in zip(self.buckets, counts):
+            acc += c; lines.append(f'{name}_bucket{{le="{b}"}} {acc}')
+        acc += counts[-1]
+        lines += [f'{name}_bucket{{le="+Inf"}} {acc}', f"{name}_sum {total:.6f}", f"{name}_count {acc}"]
+        return lines
+
+def parse_overrides(query):
+    """ 从查询参数中取出 p_* 参数覆盖，按默认参数的类型转换 """
+    overrides = {}
+    for k, vals in query.items():
+        if not k.startswith("p_"): continue
+        key = k[2:]
+        if key not in DEFAULT_PARAMS: raise ValueError(f"未知参数: {key}")
+        kind = type(DEFAULT_PARAMS[key])
+        overrides[key] = kind(float(vals[-1])) if kind is int else kind(vals[-1])
+    return overrides
+
+class ConversionService:
+    """ 任务队列与工作池。submit 在队列已满时抛出 queue.Full """
+    def __init__(self, options=None, workers=CPU_COUNT, queue_size=QUEUE_SIZE, log=print, pixel_limit=PIXEL_LIMIT):
+        opts = {**DEFAULT_OPTIONS, **(options or {})}
+        self.log, self.workers, self.pixel_limit = log, max(1, int(workers)), int(pixel_limit)
+        engine = resolve_engine(opts["engine"])
+        if engine != opts["engine"]: log("未安装 vtracer Python 模块，使用命令行引擎")
+        self.opts = {**opts, "engine": engine, "exe": opts["exe"] or resource_path(EXECUTABLE_NAME)}
+        self.queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.jobs, self.lock = OrderedDict(), threading.Lock()
+        self.work_dir = tempfile.mkdtemp(prefix="pictosvg_service_")
+        self.running, self.counts = 0, {"ok": 0, "failed": 0, "rejected": 0}
+        self.latency, self.queue_wait, self.finished = Histogram(), Histogram(), deque()
+        # Python 引擎需多进程才能并行；命令行引擎的工作都在子进程中，工作线程直接调用即可
+        self.procs = ProcessPoolExecutor(max_workers=self.workers) if engine == "python" else None
+        for _ in range(self.workers): threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, src, preset=None, overrides=None, upload=False):
+        """ 提交任务，返回任务字典。src 为图片路径；upload=True 时转换结束后删除 src。
+        像素数超过上限或无法从文件头读取尺寸时抛出 ValueError，不交给 Pillow/vtracer 解码 """
+        if self.pixel_limit:
+            w, h = image_size(src)
+            if not (w and h): raise ValueError("无法读取图片尺寸")
+            if w * h > self.pixel_limit: raise ValueError(f"图片过大: {w}x{h}，像素上限 {self.pixel_limit}")
+        params = make_params(preset, overrides)
+        auto = bool(preset) and find_preset(preset) == AUTO_PRESET
+        cfg = job_config({**self.opts, "auto": auto, "overrides": overrides or {}}, self.opts["engine"], self.opts["exe"])
+        job_id = uuid.uuid4().hex
+        out_p = os.path.join(self.work_dir, job_id + (".svgz" if cfg["svgz"] else ".svg"))
+        job = {"id": job_id, "status": "queued", "file": os.path.basename(src), "created": time.time(), "preset": AUTO_PRESET if auto else preset_name(params),
+               "src": src, "upload": upload, "out": out_p, "params": params, "cfg": cfg, "done": threading.Event()}
+        with self.lock:
+            try: self.queue.put_nowait(job)
+            except queue.Full: self.counts["rejected"] += 1; raise
+            self.jobs[job_id] = job
+        return job
+
+    def get(self, job_id):
+        with self.lock: return self.jobs.get(job_id)
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            started = time.time()
+            with self.lock: job["status"] = "running"; self.running += 1
+            self.queue_wait.observe(started - job["created"])
+            try:
+                if self.procs: res = self.procs.submit(convert_job, job["src"], job["out"], job["params"], job["cfg"]).result()
+                else: res = convert_job(job["src"], job["out"], job["params"], job["cfg"])
+            except Exception as e: res = {"code": -1, "error": str(e)}
+            finally:
+                if job["upload"]:
+                    try: os.remove(job["src"])
+                    except OSError: pass
+            now = time.time()
+            self.latency.observe(now - job["created"])
+            ok = res.get("code") == 0
+            with self.lock:
+                job.update(status="done" if ok else "failed", finished=now, result=res)
+                self.running -= 1; self.counts["ok" if ok else "failed"] += 1
+                self.finished.append(now)
+                self._evict()
+            job["done"].set()
+            if not ok: self.log(f"❌ {job['file']} ({res.get('error') or '转换失败'})")
+
+    def _evict(self):
+        # 调用方持有 self.lock：只保留最近 JOB_HISTORY 个已结束任务，吞吐量窗口外的时间戳一并丢弃
+        ended = [k for k, j in self.jobs.items() if j["status"] in ("done", "failed")]
+        for k in ended[:max(0, len(ended) - JOB_HISTORY)]:
+            try: os.remove(self.jobs.pop(k)["out"])
+            except OSError: pass
+        while self.finished and self.finished[0] < time.time() - THROUGHPUT_WINDOW: self.finished.popleft()
+
+    def status(self, job):
+        """ 对外公开的任务信息 """
+        info = {k: job[k] for k in ("id", "status", "file", "preset", "created")}
+        if job.get("finished"):
+            info["seconds"] = round(job["finished"] - job["created"], 4)
+            res = job["result"]
+            info.update({k: res[k] for k in ("preset", "bytes", "paths", "elements", "fallback", "error") if res.get(k)})
+            if job["status"] == "done": info["svg"] = f"/jobs/{job['id']}/svg"
+        return info
+
+    def metrics(self):
+        with self.lock:
+            self._evict()
+            rate = len(self.finished) / THROUGHPUT_WINDOW
+            lines = ["# TYPE pictosvg_queue_depth gauge", f"pictosvg_queue_depth {self.queue.qsize()}",
+                     "# TYPE pictosvg_queue_capacity gauge", f"pictosvg_queue_capacity {self.queue.maxsize}",
+                     "# TYPE pictosvg_jobs_running gauge", f"pictosvg_jobs_running {self.running}",
+                     "# TYPE pictosvg_workers gauge", f"pictosvg_workers {self.workers}",
+                     "# TYPE pictosvg_jobs_total counter"]
+            lines += [f'pictosvg_jobs_total{{status="{k}"}} {v}' for k, v in self.counts.items()]
+            lines += [f"# HELP pictosvg_throughput_per_second 最近 {THROUGHPUT_WINDOW} 秒完成的任务数/秒",
+                      "# TYPE pictosvg_throughput_per_second gauge", f"pictosvg_throughput_per_second {rate:.4f}"]
+        lines += self.latency.render("pictosvg_job_latency_seconds", "从提交到完成的耗时")
+        lines += self.queue_wait.render("pictosvg_queue_wait_seconds", "在队列中等待的时间")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        if self.procs: self.procs.shutdown(cancel_futures=True)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+class Handler(BaseHTTPRequestHandler):
+    service = None # 由 serve 设置
+    timeout = REQUEST_TIMEOUT # 套接字超时：客户端迟迟不发完请求时断开
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args): pass # 访问日志过于频繁，只记录失败的任务
+
+    def send(self, code, body, ctype="application/json; charset=utf-8", headers=None):
+        data = body if isinstance(body, bytes) else (json.dumps(body, ensure_ascii=False) + "\n").encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_svg(self, job):
+        with open(job["out"], 'rb') as f: data = f.read()
+        headers = {"X-Job-Id": job["id"]}
+        if job["cfg"]["svgz"]: headers["Content-Encoding"] = "gzip"
+        self.send(200, data, "image/svg+xml", headers)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.rstrip("/")
+        if path == "/metrics": return self.send(200, self.service.metrics().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        parts = path.split("/")
+        if len(parts) in (3, 4) and parts[1] == "jobs":
+            job = self.service.get(parts[2])
+            if not job: return self.send(404, {"error": "任务不存在"})
+            if len(parts) == 3: return self.send(200, self.service.status(job))
+            if parts[3] == "svg":
+                if job["status"] == "done": return self.send_svg(job)
+                return self.send(409, self.service.status(job))
+        self.send(404, {"error": "未知路径"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/convert": return self.send(404, {"error": "未知路径"})
+        q = parse_qs(url.query)
+        arg = lambda k, d=None: q[k][-1] if k in q else d
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_UPLOAD: self.close_connection = True; return self.send(413, {"error": "文件过大"})
+        body = self.rfile.read(length) if length else b""
+        try:
+            wait_s = min(float(arg("wait", REQUEST_TIMEOUT)), REQUEST_TIMEOUT)
+            overrides, preset = parse_overrides(q), arg("preset")
+            if preset and not find_preset(preset): raise ValueError(f"未知预设: {preset}")
+        except ValueError as e: return self.send(400, {"error": str(e)})
+        if arg("path"):
+            src, upload = os.path.abspath(arg("path")), False
+            if not os.path.isfile(src): return self.send(400, {"error": f"找不到文件: {src}"})
+        elif body:
+            # vtracer 按扩展名选择解码器，扩展名由文件头决定 (与 image_size 识别的格式相同)
+            ext = sniff_image(body[:32])
+            if not ext: return self.send(400, {"error": "无法识别的图片格式，支持: " + ", ".join(sorted(IMAGE_EXTS))})
+            fd, src = tempfile.mkstemp(suffix=ext, dir=self.service.work_dir)
+            with os.fdopen(fd, 'wb') as f: f.write(body)
+            upload = True
+        else: return self.send(400, {"error": "需要上传图片或提供 path"})
+        try: job = self.service.submit(src, preset, overrides, upload)
+        except queue.Full:
+            if upload: os.remove(src)
+            return self.send(429, {"error": "队列已满，请稍后重试"}, headers={"Retry-After": "1"})
+        except ValueError as e:
+            if upload: os.remove(src)
+            return self.send(400, {"error": str(e)})
+        if wait_s > 0 and job["done"].wait(wait_s) and job["status"] == "done": return self.send_svg(job)
+        code = 500 if job["status"] == "failed" else 202
+        self.send(code, self.service.status(job), headers={"Location": f"/jobs/{job['id']}"})
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, options=None, workers=CPU_COUNT, queue_size=QUEUE_SIZE, log=print, pixel_limit=PIXEL_LIMIT):
+    """ 启动服务并阻塞，Ctrl+C 结束 """
+    service = ConversionService(options, workers, queue_size, log, pixel_limit)
+    handler = type("PicToSvgHandler", (Handler,), {"service": service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    log(f"PicToSvg 服务已启动: http://{host}:{httpd.server_address[1]} (工作池 {service.workers}，队列 {service.queue.maxsize})")
+    try: httpd.serve_forever()
+    except KeyboardInterrupt: pass
+    finally: httpd.server_close(); service.close()
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="pictosvg-service", description="PicToSvg 本地 HTTP 转换服务")
+    ap.add_argument("--host", default="127.0.0.1", help="监听地址 (默认仅本机)")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    ap.add_argument("-j", "--workers", type=int, default=DEFAULT_OPTIONS["workers"], help="工作池大小 (默认 CPU 核数)")
+    ap.add_argument("--queue", type=int, default=QUEUE_SIZE, help="等待队列上限，超出返回 429")
+    ap.add_argument("--engine", choices=ENGINES, default=DEFAULT_OPTIONS["engine"], help="转换引擎")
+    ap.add_argument("--timeout", type=float, default=0, help="单个任务超时秒数 (0=不限)")
+    ap.add_argument("--mem-limit", type=int, default=0, metavar="MB", help="单个任务内存上限 MB (0=不限，仅 Linux/macOS)")
+    ap.add_argument("--pixel-limit", type=int, default=PIXEL_LIMIT, help="单张图片像素上限，超出返回 400 (0=不限)")
+    ap.add_argument("--max-edge", type=int, default=0, help="预处理: 长边上限像素")
+    ap.add_argument("--optimize", action="store_true", help="后处理优化 SVG")
+    ap.add_argument("--precision", type=int, default=DEFAULT_OPTIONS["opt_precision"], help="优化后保留的小数位数")
+    ap.add_argument("--svgz", action="store_true", help="返回 gzip 压缩的 SVG")
+    ap.add_argument("--vtracer", help="vtracer 可执行文件路径")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    a = parse_args(argv)
+    options = {"engine": a.engine, "exe": a.vtracer, "workers": a.workers, "timeout": a.timeout, "mem_limit": a.mem_limit,
+               "max_edge": a.max_edge, "optimize": a.optimize, "opt_precision": a.precision, "svgz": a.svgz}
+    serve(a.host, a.port, options, a.workers, a.queue, log=lambda m: print(m, flush=True), pixel_limit=a.pixel_limit)
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,167 @@
+""" PicToSvg SVG 文本处理：尺寸还原等 (纯标准库，不解析为 DOM) """
+import re
+
+SVG_TAG = re.compile(r"<svg\b[^>]*>", re.S)
+ATTR = r'\s{}="([^"]*)"'
+
+def _num(v):
+    return f"{v:g}" if isinstance(v, float) else str(v)
+
+def get_attr(tag, name):
+    m = re.search(ATTR.format(name), tag)
+    return m.group(1) if m else None
+
+def set_attr(tag, name, value):
+    """ 替换或追加标签属性 """
+    if get_attr(tag, name) is not None: return re.sub(ATTR.format(name), lambda m: f' {name}="{value}"', tag, count=1)
+    end = -2 if tag.endswith("/>") else -1
+    return f'{tag[:end]} {name}="{value}"{tag[end:]}'
+
+def rescale_svg(svg, width, height):
+    """ 把按缩小图生成的 SVG 还原为原图尺寸：width/height 设为原尺寸，viewBox 保留缩小后的坐标系 """
+    m = SVG_TAG.search(svg)
+    if not m: return svg
+    tag = m.group(0)
+    if get_attr(tag, "viewBox") is None:
+        w, h = get_attr(tag, "width"), get_attr(tag, "height")
+        if w is None or h is None: return svg
+        tag = set_attr(tag, "viewBox", f"0 0 {w} {h}")
+    tag = set_attr(set_attr(tag, "width", _num(width)), "height", _num(height))
+    return svg[:m.start()] + tag + svg[m.end():]
+
+def svg_body(svg):
+    """ 根元素 <svg> 内部的内容 """
+    m = SVG_TAG.search(svg)
+    if not m: return ""
+    end = svg.rfind("</svg>")
+    return svg[m.end():end if end > m.end() else len(svg)].strip("\n")
+
+def stitch_svgs(tiles, width, height, seam=0.5):
+    """ 拼接分块结果。tiles: [(分块SVG, 偏移x, 偏移y, 核心区(x0, y0, x1, y1))]。
+    每块平移到原位置并裁剪到核心区，核心区外扩 seam 像素以消除相邻块之间的细缝 """
+    defs, groups = [], []
+    for i, (svg, ox, oy, (x0, y0, x1, y1)) in enumerate(tiles):
+        # clipPath 位于 <g> 的局部坐标系 (已含平移)，需换算为分块内坐标
+        defs.append(f'<clipPath id="tile{i}"><rect x="{_num(x0 - ox - seam)}" y="{_num(y0 - oy - seam)}" '
+                    f'width="{_num(x1 - x0 + 2 * seam)}" height="{_num(y1 - y0 + 2 * seam)}"/></clipPath>')
+        groups.append(f'<g transform="translate({ox},{oy})" clip-path="url(#tile{i})">\n{svg_body(svg)}\n</g>')
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg version="1.1" xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">\n'
+            '<defs>\n' + "\n".join(defs) + '\n</defs>\n' + "\n".join(groups) + '\n</svg>\n')
+
+# === 路径优化 ===
+PATH_EL = re.compile(r"<path\b([^>]*?)/>", re.S)
+PATH_ATTR = re.compile(r'([\w:-]+)="([^"]*)"')
+PATH_TOKEN = re.compile(r"[MmLlHhVvCcQqZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+TRANSLATE = re.compile(r"^\s*translate\(\s*([-+\d.eE]+)(?:[\s,]+([-+\d.eE]+))?\s*\)\s*$")
+ARG_COUNT = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "Q": 4, "Z": 0}
+
+def parse_path(d, dx=0.0, dy=0.0):
+    """ 解析路径为绝对坐标命令列表 [(命令, [x1, y1, ...])]，命令为 M/L/C/Q/Z，同时叠加平移 (dx, dy)。
+    含不支持的命令 (A/S/T 等) 时返回 None """
+    if not re.fullmatch(r"[\s,]*", PATH_TOKEN.sub(" ", d)): return None
+    tokens = PATH_TOKEN.findall(d)
+    cmds, i, cmd = [], 0, None
+    cx = cy = sx = sy = 0.0
+    while i < len(tokens):
+        if tokens[i].isalpha(): cmd = tokens[i]; i += 1
+        elif cmd is None: return None
+        up, rel = cmd.upper(), cmd.islower()
+        if up == "Z":
+            cmds.append(("Z", [])); cx, cy = sx, sy; continue
+        n = ARG_COUNT[up]
+        if i + n > len(tokens) or any(t.isalpha() for t in tokens[i:i + n]): return None
+        a = [float(t) for t in tokens[i:i + n]]; i += n
+        if up == "H": up, a = "L", [a[0] + (cx if rel else dx), cy]
+        elif up == "V": up, a = "L", [cx, a[0] + (cy if rel else dy)]
+        else: a = [v + ((cx if k % 2 == 0 else cy) if rel else (dx if k % 2 == 0 else dy)) for k, v in enumerate(a)]
+        cmds.append((up, a))
+        cx, cy = a[-2], a[-1]
+        if up == "M": sx, sy = cx, cy; cmd = "l" if rel else "L" # M 之后的隐式坐标视为 L
+    return cmds
+
+def _fmt(v, prec):
+    s = f"{v:.{prec}f}".rstrip("0").rstrip(".") if prec > 0 else str(int(round(v)))
+    if s in ("-0", "", "-"): s = "0"
+    if s.startswith("0."): s = s[1:]
+    elif s.startswith("-0."): s = "-" + s[2:]
+    return s
+
+def _serialize(tokens):
+    """ 拼接命令与数字，只在必要时插入空格 (负号、以及前一个数已含小数点时的小数点都可充当分隔) """
+    out, prev = [], None
+    for t in tokens:
+        if prev and not t[0].isalpha() and not prev[-1].isalpha():
+            if not (t[0] == "-" or (t[0] == "." and "." in prev)): out.append(" ")
+        out.append(t); prev = t
+    return "".join(out)
+
+def format_path(cmds, prec):
+    """ 以相对命令输出，坐标按 prec 位小数取整；在取整后的绝对坐标上求差，避免误差累积 """
+    tokens, cx, cy, sx, sy, last = [], 0.0, 0.0, 0.0, 0.0, None
+    for up, a in cmds:
+        if up == "Z":
+            tokens.append("z"); cx, cy = sx, sy; last = "z"; continue
+        pts = [round(v, prec) for v in a]
+        c = up.lower()
+        if c != last or c == "m": tokens.append(c)
+        tokens.extend(_fmt(v - (cx if k % 2 == 0 else cy), prec) for k, v in enumerate(pts))
+        last = "l" if c == "m" else c # m 之后的隐式坐标即为 l
+        cx, cy = pts[-2], pts[-1]
+        if up == "M": sx, sy = cx, cy
+    return _serialize(tokens)
+
+def path_bbox(cmds):
+    xs = [v for _, a in cmds for v in a[0::2]]
+    ys = [v for _, a in cmds for v in a[1::2]]
+    return (min(xs), min(ys), max(xs), max(ys)) if xs else None
+
+def _overlap(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def _invisible(attrs):
+    if "stroke" in attrs and attrs["stroke"] != "none": return False
+    return attrs.get("fill") == "none" or any(attrs.get(k, "").strip() in ("0", "0.0") for k in ("opacity", "fill-opacity"))
+
+def optimize_svg(svg, precision=2):
+    """ 优化 vtracer 输出：坐标重新取整、改为相对命令、平移写入坐标、
+    合并相邻且同色的路径 (仅在包围盒互不重叠时合并，保证填充结果不变)、丢弃不可见与退化的形状 """
+    out, pos, run = [], 0, []
+
+    def emit(attrs, cmds):
+        extra = "".join(f' {k}="{v}"' for k, v in attrs.items())
+        return f'<path d="{format_path(cmds, precision)}"{extra}/>'
+
+    def flush():
+        items, group = [], None # group: [属性, 命令列表, 合并后的包围盒]
+        for raw, attrs, cmds, box in run:
+            if cmds is None: # 无法解析的路径原样保留，并打断合并
+                if group: items.append(emit(*group[:2])); group = None
+                items.append(raw); continue
+            if group and group[0] == attrs and not _overlap(group[2], box):
+                group[1] = group[1] + cmds
+                group[2] = (min(group[2][0], box[0]), min(group[2][1], box[1]), max(group[2][2], box[2]), max(group[2][3], box[3]))
+            else:
+                if group: items.append(emit(*group[:2]))
+                group = [attrs, cmds, box]
+        if group: items.append(emit(*group[:2]))
+        out.append("\n".join(items))
+        run.clear()
+
+    for m in PATH_EL.finditer(svg):
+        gap = svg[pos:m.start()]
+        if gap.strip() or not run: flush(); out.append(gap) # 路径之间只有空白时视为相邻
+        pos = m.end()
+        attrs = dict(PATH_ATTR.findall(m.group(1)))
+        d, tr = attrs.pop("d", ""), attrs.pop("transform", None)
+        tm = TRANSLATE.match(tr) if tr else None
+        cmds = parse_path(d, float(tm.group(1)), float(tm.group(2) or 0)) if tm else parse_path(d) if tr is None else None
+        if cmds is None: run.append((m.group(0), None, None, None)); continue
+        if _invisible(attrs): continue
+        box = path_bbox(cmds)
+        eps = 10 ** -precision
+        if not box or box[2] - box[0] < eps or box[3] - box[1] < eps: continue # 退化形状 (面积为零)
+        run.append((m.group(0), attrs, cmds, box))
+    flush()
+    out.append(svg[pos:])
+    return "".join(out)
@@ -0,0 +1,142 @@
+""" PicToSvg 文件夹监视：持续转换新增或修改的图片 (Linux 使用 inotify，其他平台轮询)，复用 run_batch 流水线 """
+import os
+import ctypes
+import ctypes.util
+import select
+import struct
+import time
+import queue
+from pictosvg_core import iter_images, match_image, run_batch
+
+# === 监视配置 ===
+WATCH_POLL = 2.0    # 轮询间隔 (秒)，inotify 不可用时使用
+WATCH_SETTLE = 1.0  # 文件大小与修改时间保持不变多久后视为写入完成 (秒)
+WATCH_TICK = 0.25   # 检查待定文件的间隔 (秒)
+
+# inotify 事件掩码 (见 <sys/inotify.h>)
+IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE = 0x2, 0x8, 0x80, 0x100
+IN_Q_OVERFLOW, IN_ISDIR = 0x4000, 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT = struct.Struct("iIII") # wd, mask, cookie, len
+
+class Inotify:
+    """ 通过 ctypes 调用 Linux inotify (非阻塞)；当前平台不支持时构造抛出 OSError """
+    def __init__(self):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            init, self._add = libc.inotify_init1, libc.inotify_add_watch
+        except (OSError, AttributeError) as e: raise OSError(f"inotify 不可用: {e}")
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.dirs = {}
+
+    def add(self, path):
+        wd = self._add(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0: raise OSError(ctypes.get_errno(), f"无法监视 {path}")
+        self.dirs[wd] = path
+
+    def read(self, timeout):
+        """ 等待最多 timeout 秒，返回 [(路径, 是否目录)]；内核事件队列溢出时返回 None (需重新扫描) """
+        if not select.select([self.fd], [], [], timeout)[0]: return []
+        try: data = os.read(self.fd, 65536)
+        except BlockingIOError: return []
+        events, i = [], 0
+        while i + EVENT.size <= len(data):
+            wd, mask, _, n = EVENT.unpack_from(data, i)
+            name = data[i + EVENT.size:i + EVENT.size + n].rstrip(b"\0")
+            i += EVENT.size + n
+            if mask & IN_Q_OVERFLOW: return None
+            if wd in self.dirs and name: events.append((os.path.join(self.dirs[wd], os.fsdecode(name)), bool(mask & IN_ISDIR)))
+        return events
+
+    def close(self): os.close(self.fd)
+
+def watch_source(log=print, poll=False, settle=WATCH_SETTLE):
+    """ 返回供 run_batch 使用的文件来源：先产出已有文件，之后持续产出写入完成的新文件或修改过的文件，
+    直到 stop 被设置。poll=True 时强制使用轮询 """
+    def source(in_dir, opts, out_dir, q, stop):
+        try: _watch(in_dir, opts, out_dir, q, stop, log, poll, settle)
+        except Exception as e: log(f"监视出错: {e}")
+        finally: q.put(None)
+    return source
+
+def _watch(in_dir, opts, out_dir, q, stop, log, poll, settle):
+    recursive, include, exclude = opts["recursive"], opts["include"], opts["exclude"]
+    out_real = os.path.realpath(out_dir)
+    notify = None
+    if not poll:
+        try: notify = Inotify()
+        except OSError as e: log(f"{e}，改用轮询")
+    seen, waiting = {}, {} # seen: 轮询快照 路径 -> 签名；waiting: 待定文件 路径 -> (签名, 签名开始不变的时刻)
+
+    def put(fp, size):
+        # 有界队列：流水线繁忙时在此等待，不会无限堆积
+        while not stop.is_set():
+            try: q.put((fp, size), timeout=0.2); return
+            except queue.Full: pass
+
+    def inside_output(path):
+        real = os.path.realpath(path)
+        return real == out_real or real.startswith(out_real + os.sep)
+
+    def consider(fp):
+        if not inside_output(fp) and match_image(os.path.relpath(fp, in_dir), recursive, include, exclude): waiting.setdefault(fp, (None, 0))
+
+    def watch_tree(d):
+        """ 为 d 及其子目录添加监视 (跳过输出目录)，并检查其中已有的文件 """
+        for root, dirs, files in os.walk(d):
+            dirs[:] = [x for x in dirs if not inside_output(os.path.join(root, x))] if recursive else []
+            try: notify.add(root)
+            except OSError as e: log(str(e))
+            if root != in_dir:
+                for f in files: consider(os.path.join(root, f))
+
+    def scan(initial):
+        """ 遍历一次：新增或变化的文件进入待定；首次遍历时已写入完成的文件直接产出 """
+        nonlocal seen
+        now, snap = time.time(), {}
+        for fp, size in iter_images(in_dir, recursive, include, exclude, [out_dir]):
+            if stop.is_set(): return
+            try: st = os.stat(fp)
+            except OSError: continue
+            sig = (st.st_size, st.st_mtime_ns)
+            if notify is None: snap[fp] = sig # 只有轮询需要快照
+            if seen.get(fp) == sig: continue
+            if initial and now - st.st_mtime >= settle: put(fp, size)
+            else: waiting.setdefault(fp, (None, 0))
+        seen = snap
+
+    def settle_waiting():
+        """ 大小与修改时间在 settle 秒内保持不变的文件视为写入完成，交给流水线 """
+        now = time.monotonic()
+        for fp, (sig, since) in list(waiting.items()):
+            try: st = os.stat(fp)
+            except OSError: del waiting[fp]; continue
+            cur = (st.st_size, st.st_mtime_ns)
+            if cur != sig: waiting[fp] = (cur, now)
+            elif now - since >= settle: del waiting[fp]; put(fp, st.st_size)
+
+    try:
+        if notify: watch_tree(in_dir) # 先建立监视再遍历，遍历期间写入的文件不会遗漏
+        scan(True)
+        log(f"正在监视 {in_dir} ({'inotify' if notify else '轮询'})，新图片写入完成后自动转换...")
+        next_poll = time.monotonic() + WATCH_POLL
+        while not stop.is_set():
+            if notify:
+                events = notify.read(WATCH_TICK)
+                if events is None: log("文件事件过多，重新扫描"); scan(False); events = []
+                for path, is_dir in events:
+                    if not is_dir: consider(path)
+                    elif recursive and not inside_output(path): watch_tree(path)
+            else:
+                stop.wait(WATCH_TICK)
+                if time.monotonic() >= next_poll: scan(False); next_poll = time.monotonic() + WATCH_POLL
+            settle_waiting()
+    finally:
+        if notify: notify.close()
+
+def watch(in_dir, out_dir, params, options=None, log=print, progress=None, stop=None, poll=False):
+    """ 监视 in_dir，持续转换新增或修改的图片，直到 stop 事件被设置。
+    参数与 run_batch 相同，增量清单、删除原文件与输出目录结构规则保持一致 """
+    return run_batch(in_dir, out_dir, params, options, log=log, progress=progress, source=watch_source(log, poll), stop=stop)
@@ -0,0 +1,25 @@
+""" pictosvg_core 中不依赖 vtracer 的工具函数的单元测试 (python -m pytest 或 python -m unittest) """
+import unittest
+from pictosvg_core import percentile
+
+class PercentileTest(unittest.TestCase):
+    def test_nearest_rank(self):
+        v = list(range(1, 101))
+        self.assertEqual(percentile(v, 50), 50)
+        self.assertEqual(percentile(v, 95), 95)
+        self.assertEqual(percentile(v, 99), 99)
+        self.assertEqual(percentile(v, 100), 100)
+        self.assertEqual(percentile(range(1, 21), 95), 19)
+
+    def test_rank_rounds_up(self):
+        self.assertEqual(percentile([1, 2, 3], 50), 2)
+        self.assertEqual(percentile([1, 2, 3, 4, 5, 6, 7], 95), 7)
+
+    def test_unsorted_and_none(self):
+        self.assertEqual(percentile([5, None, 1, 3], 50), 3)
+        self.assertEqual(percentile([4], 0), 4)
+        self.assertIsNone(percentile([None], 50))
+        self.assertIsNone(percentile([], 95))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+""" pictosvg_svg 路径解析、输出、优化与拼接的单元测试 (python -m pytest 或 python -m unittest) """
+import unittest
+from pictosvg_svg import parse_path, format_path, optimize_svg, stitch_svgs, rescale_svg, PATH_EL, PATH_ATTR
+
+def paths(svg):
+    """ 输出中各 <path> 的属性字典 """
+    return [dict(PATH_ATTR.findall(m.group(1))) for m in PATH_EL.finditer(svg)]
+
+def doc(*els):
+    return '<svg width="100" height="100">\n' + "\n".join(els) + '\n</svg>\n'
+
+class ParsePathTest(unittest.TestCase):
+    def test_absolute(self):
+        self.assertEqual(parse_path("M1 2 L3 4 C5 6 7 8 9 10 Q1 2 3 4 Z"),
+                         [("M", [1, 2]), ("L", [3, 4]), ("C", [5, 6, 7, 8, 9, 10]), ("Q", [1, 2, 3, 4]), ("Z", [])])
+
+    def test_relative(self):
+        self.assertEqual(parse_path("m1 2 l3 4 c1 1 2 2 3 3 q1 0 2 2"),
+                         [("M", [1, 2]), ("L", [4, 6]), ("C", [5, 7, 6, 8, 7, 9]), ("Q", [8, 9, 9, 11])])
+
+    def test_horizontal_vertical(self):
+        self.assertEqual(parse_path("M1 2 H5 V7 h1 v-2"), [("M", [1, 2]), ("L", [5, 2]), ("L", [5, 7]), ("L", [6, 7]), ("L", [6, 5])])
+
+    def test_implicit_lineto_after_moveto(self):
+        self.assertEqual(parse_path("M0 0 10 0 10 10"), [("M", [0, 0]), ("L", [10, 0]), ("L", [10, 10])])
+        self.assertEqual(parse_path("m1 1 2 2 1 0"), [("M", [1, 1]), ("L", [3, 3]), ("L", [4, 3])])
+
+    def test_close_returns_to_subpath_start(self):
+        self.assertEqual(parse_path("m1 1 l2 0 z l1 1"), [("M", [1, 1]), ("L", [3, 1]), ("Z", []), ("L", [2, 2])])
+
+    def test_translate_applies_to_absolute_only(self):
+        self.assertEqual(parse_path("M1 2 L3 4 l1 1 H0 v1", 10, 20),
+                         [("M", [11, 22]), ("L", [13, 24]), ("L", [14, 25]), ("L", [10, 25]), ("L", [10, 26])])
+
+    def test_compact_numbers(self):
+        self.assertEqual(parse_path("M.5-.5L1e1,2"), [("M", [0.5, -0.5]), ("L", [10, 2])])
+
+    def test_unsupported(self):
+        self.assertIsNone(parse_path("M0 0 A1 1 0 0 1 2 2"))
+        self.assertIsNone(parse_path("1 2 L3 4"))  # 缺少起始命令
+        self.assertIsNone(parse_path("M0 0 L3"))   # 参数不足
+
+class FormatPathTest(unittest.TestCase):
+    def test_relative_output(self):
+        # m 之后的坐标是隐式的 l，不重复写出命令字母
+        self.assertEqual(format_path([("M", [1, 2]), ("L", [4, 6]), ("L", [5, 6]), ("Z", [])], 0), "m1 2 3 4 1 0z")
+
+    def test_separators(self):
+        self.assertEqual(format_path([("M", [0.5, -0.5]), ("L", [0.75, 0.25])], 2), "m.5-.5.25.75")
+
+    def test_moveto_after_close_is_relative_to_start(self):
+        cmds = [("M", [10, 10]), ("L", [20, 10]), ("Z", []), ("M", [15, 15]), ("L", [16, 15])]
+        self.assertEqual(format_path(cmds, 0), "m10 10 10 0zm5 5 1 0")
+
+    def test_round_trip(self):
+        d = "M10.123 20.456 C11 21 12 22 13.5 23.25 L40 40 Q41 41 42 40 Z M50 50 L60 60 Z"
+        cmds = parse_path(d)
+        back = parse_path(format_path(cmds, 3))
+        self.assertEqual([c for c, _ in back], [c for c, _ in cmds])
+        for (_, a), (_, b) in zip(cmds, back):
+            for x, y in zip(a, b): self.assertAlmostEqual(x, y, places=3)
+
+    def test_no_error_accumulation(self):
+        # 在取整后的绝对坐标上求差，多次相对移动后仍落在取整后的位置
+        cmds = [("M", [0, 0])] + [("L", [i * 0.333, 0]) for i in range(1, 31)]
+        back = parse_path(format_path(cmds, 1))
+        self.assertAlmostEqual(back[-1][1][0], round(30 * 0.333, 1), places=6)
+
+class OptimizeSvgTest(unittest.TestCase):
+    SQUARE = '<path d="M0 0 L10 0 L10 10 L0 10 Z" fill="#FF0000" transform="translate({},{})"/>'
+
+    def test_translate_folded_into_coordinates(self):
+        out = paths(optimize_svg(doc(self.SQUARE.format(5, 7)), 2))
+        self.assertEqual(out, [{"d": "m5 7 10 0 0 10-10 0z", "fill": "#FF0000"}])
+
+    def test_merge_adjacent_same_fill(self):
+        out = paths(optimize_svg(doc(self.SQUARE.format(0, 0), self.SQUARE.format(20, 0)), 2))
+        self.assertEqual(len(out), 1)
+        self.assertEqual(parse_path(out[0]["d"])[5], ("M", [20, 0]))
+
+    def test_no_merge_when_overlapping(self):
+        out = paths(optimize_svg(doc(self.SQUARE.format(0, 0), self.SQUARE.format(5, 5)), 2))
+        self.assertEqual(len(out), 2)
+
+    def test_no_merge_across_colours_or_elements(self):
+        other = self.SQUARE.format(20, 0).replace("#FF0000", "#00FF00")
+        self.assertEqual(len(paths(optimize_svg(doc(self.SQUARE.format(0, 0), other), 2))), 2)
+        split = doc(self.SQUARE.format(0, 0), "<g/>", self.SQUARE.format(20, 0))
+        self.assertEqual(len(paths(optimize_svg(split, 2))), 2)
+
+    def test_drops_degenerate_and_invisible(self):
+        line = '<path d="M0 0 L10 0 L20 0 Z" fill="#000000"/>'
+        hidden = '<path d="M0 0 L10 0 L10 10 Z" fill="none"/>'
+        transparent = '<path d="M0 0 L10 0 L10 10 Z" fill="#000000" opacity="0"/>'
+        out = paths(optimize_svg(doc(line, hidden, transparent, self.SQUARE.format(0, 0)), 2))
+        self.assertEqual(len(out), 1)
+        self.assertEqual(out[0]["fill"], "#FF0000")
+
+    def test_unparseable_path_kept_verbatim(self):
+        arc = '<path d="M0 0 A5 5 0 0 1 10 10 Z" fill="#000000"/>'
+        rotated = '<path d="M0 0 L10 0 L10 10 Z" fill="#000000" transform="rotate(45)"/>'
+        svg = optimize_svg(doc(arc, rotated), 2)
+        self.assertIn(arc, svg); self.assertIn(rotated, svg)
+
+    def test_precision(self):
+        p = '<path d="M0.123456 0 L10.987654 0 L10 10.5555 Z" fill="#000000"/>'
+        self.assertEqual(paths(optimize_svg(doc(p), 1))[0]["d"], "m.1 0 10.9 0-1 10.6z")
+
+class StitchAndRescaleTest(unittest.TestCase):
+    def test_stitch(self):
+        tile = '<?xml version="1.0"?>\n<svg width="12" height="10">\n<path d="M0 0 L1 1 Z"/>\n</svg>\n'
+        svg = stitch_svgs([(tile, 0, 0, (0, 0, 10, 10)), (tile, 8, 0, (10, 0, 20, 10))], 20, 10)
+        self.assertIn('width="20" height="10"', svg)
+        self.assertIn('<clipPath id="tile0"><rect x="-0.5" y="-0.5" width="11" height="11"/></clipPath>', svg)
+        # 第二块从 x=8 开始 (含 2 像素重叠)，核心区在块内坐标 2..12
+        self.assertIn('<clipPath id="tile1"><rect x="1.5" y="-0.5" width="11" height="11"/></clipPath>', svg)
+        self.assertIn('<g transform="translate(8,0)" clip-path="url(#tile1)">\n<path d="M0 0 L1 1 Z"/>\n</g>', svg)
+        self.assertEqual(svg.count("<svg"), 1)
+
+    def test_rescale(self):
+        out = rescale_svg('<svg version="1.1" width="50" height="25"><path d="M0 0"/></svg>', 200, 100)
+        self.assertIn('width="200"', out); self.assertIn('height="100"', out); self.assertIn('viewBox="0 0 50 25"', out)
+
+if __name__ == "__main__":
+    unittest.main()